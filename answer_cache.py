@@ -0,0 +1,120 @@
+"""
+Cache คำตอบของ answer_question สำหรับคำถามที่ลูกค้าถามซ้ำ ๆ ("ราคาเท่าไหร่", "มีกี่สี")
+
+key คือ (product_id, คำถามที่ normalize แล้ว, generation ของ index) index ใหม่จึงไม่ได้คำตอบจากข้อมูลเก่า
+    exact     คำถามเดียวกันหลัง normalize (ตัวพิมพ์, ช่องว่าง, เครื่องหมาย, คำลงท้าย ครับ/ค่ะ)
+    semantic  cosine similarity ของ embedding คำถาม >= threshold กับคำถามที่เคยตอบของสินค้าเดียวกัน
+เก็บใน memory ของ process แบบ LRU (max_entries) และหมดอายุตาม ttl วินาที
+
+get() ค้นแค่ tier exact (ไม่ embed) จึงเรียกได้ก่อน retrieval; tier semantic อยู่ใน get_similar() ที่รับ
+เวกเตอร์คำถามที่ retrieval embed ไว้แล้ว คำถามหนึ่งจึง embed ไม่เกินครั้งเดียว (ครั้งของ retrieval)
+"""
+import re, time, threading, unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+import generations
+from embeddings import unit_vectors
+
+MAX_ENTRIES = 1000
+TTL_SECONDS = 6 * 3600
+SIMILARITY_THRESHOLD = 0.95
+
+_POLITE = re.compile(r"(\s*(ครับ|คับ|ค่ะ|คะ|ค่า|จ้า|จ้ะ|นะ|หน่อย))+$")
+
+def normalize_question(question):
+    text = unicodedata.normalize("NFC", question).casefold()
+    # ตัดเครื่องหมายด้วย category ของ Unicode (\W ของ re นับสระ/วรรณยุกต์ไทยเป็นเครื่องหมายด้วย)
+    text = "".join(" " if unicodedata.category(ch)[0] in "PS" else ch for ch in text)
+    text = " ".join(text.split())
+    return _POLITE.sub("", text).strip()
+
+class AnswerCache:
+    """
+    ไม่ embed เอง: put/get_similar รับเวกเตอร์คำถามที่ retrieval embed ไว้ คำตอบที่ไม่มีเวกเตอร์
+    (lexical fast path) เก็บไว้แค่ tier exact
+    threshold: ยิ่งสูงยิ่งต้องถามเหมือนกันมาก (ค่าที่เหมาะขึ้นกับ embedding model; 0 = ใช้แค่ exact)
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, threshold=SIMILARITY_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (created_at, result, vector)
+        self.stats = {"exact": 0, "semantic": 0, "miss": 0, "evicted": 0, "expired": 0}
+
+    def _key(self, product_id, question, version):
+        return (product_id or "", normalize_question(question), version)
+
+    def _expired(self, created_at, now):
+        return self.ttl and now - created_at > self.ttl
+
+    def get(self, product_id, question, version=None):
+        """คำตอบที่เคยเก็บไว้ของคำถามเดียวกันหลัง normalize (dict เดียวกับที่ answer_question คืน) หรือ None"""
+        version = generations.current_generation() if version is None else version
+        key = self._key(product_id, question, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._expired(entry[0], time.time()):
+                del self._entries[key]
+                self.stats["expired"] += 1
+                entry = None
+            if entry:
+                self._entries.move_to_end(key)
+                self.stats["exact"] += 1
+                return entry[1]
+            self.stats["miss"] += 1
+        return None
+
+    def get_similar(self, product_id, vector, version=None):
+        """
+        คำตอบของคำถามที่เคยตอบของสินค้านี้ที่ cosine similarity กับ vector >= threshold หรือ None
+        ใช้หลัง get() พลาด (นับ hit ใน stats["semantic"]; miss นับไปแล้วใน get)
+        """
+        if vector is None or not self.threshold:
+            return None
+        version = generations.current_generation() if version is None else version
+        now = time.time()
+        with self._lock:
+            candidates = [(k, e[2]) for k, e in self._entries.items()
+                          if k[0] == (product_id or "") and k[2] == version and e[2] is not None
+                          and not self._expired(e[0], now)]
+        if not candidates:
+            return None
+        scores = np.stack([v for _, v in candidates]) @ unit_vectors(vector)
+        i = int(np.argmax(scores))
+        if scores[i] < self.threshold:
+            return None
+        with self._lock:
+            entry = self._entries.get(candidates[i][0])
+            if not entry:
+                return None
+            self._entries.move_to_end(candidates[i][0])
+            self.stats["semantic"] += 1
+            return entry[1]
+
+    def put(self, product_id, question, result, version=None, vector=None):
+        """vector: เวกเตอร์คำถามจาก retrieval (None = เก็บแค่ tier exact เช่นคำถามที่ตอบจาก lexical fast path)"""
+        version = generations.current_generation() if version is None else version
+        key = self._key(product_id, question, version)
+        vec = unit_vectors(vector) if vector is not None and self.threshold and key[1] else None
+        with self._lock:
+            self._entries[key] = (time.time(), result, vec)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evicted"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def hit_rate(self):
+        # semantic hit ทุกครั้งนับเป็น miss ของ get() มาก่อนแล้ว
+        lookups = self.stats["exact"] + self.stats["miss"]
+        return (self.stats["exact"] + self.stats["semantic"]) / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._entries)
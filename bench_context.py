@@ -0,0 +1,65 @@
+"""
+วัดผลของ context_packer บนคำถาม FAQ (ชุดเดียวกับ bench_retrieval.py)
+
+ต่อคำถาม: retrieval.retrieve k chunk แล้ว pack ด้วย token budget รายงาน token ของ context ก่อน/หลัง
+(ก่อน = ต่อทุก chunk แบบ build_prompt เดิม), จำนวน chunk ที่เหลือ และสัดส่วนคำถามที่ chunk คำตอบ
+(ที่ retrieval หาเจอ) ยังอยู่ใน context หลัง pack
+
+    python bench_context.py --provider hashing
+    python bench_context.py --provider hashing --budget 800 --chunkers thai,words
+"""
+import shutil, argparse, tempfile
+
+import ingest
+import retrieval
+import lexical_index
+import context_packer
+from embeddings import get_embeddings
+from bench_retrieval import build_eval_set, open_numpy
+from bench_vector_store import percentile
+
+def evaluate(store, lexical, queries, emb, budget, k):
+    saved, kept, tokens_in, tokens_out, found, retained = [], [], 0, 0, 0, 0
+    for q in queries:
+        docs = retrieval.retrieve(q["question"], q["product_id"], k=k, store=store, lexical=lexical)
+        packed, _, report = context_packer.pack(q["question"], docs, embedding=emb, budget=budget)
+        tokens_in += report["tokens_in"]
+        tokens_out += report["tokens_out"]
+        saved.append(report["tokens_saved"])
+        kept.append(report["chunks_out"])
+        if any(d.metadata.get("chunk_id") in q["relevant"] for d in docs):
+            found += 1
+            retained += any(d.metadata.get("chunk_id") in q["relevant"] for d in packed)
+    n = max(len(queries), 1)
+    return {"queries": len(queries), "tokens_in": tokens_in / n, "tokens_out": tokens_out / n,
+            "saved_pct": 1 - tokens_out / tokens_in if tokens_in else 0.0,
+            "saved_p50": percentile(saved, 50), "chunks_out": sum(kept) / n,
+            "answer_retained": retained / found if found else 0.0}
+
+def main(provider=None, chunkers=ingest.CHUNKERS, budget=context_packer.TOKEN_BUDGET, k=6):
+    emb = get_embeddings(provider=provider)
+    cols = ("tokens_in", "tokens_out", "saved_pct", "saved_p50", "chunks_out", "answer_retained")
+    print(f"{'chunker':<8} {'queries':>7} " + " ".join(f"{c[:15]:>15}" for c in cols))
+    results = []
+    for chunker in chunkers:
+        chunks, queries = build_eval_set(chunker)
+        lexical = lexical_index.LexicalIndex(lexical_index.build_index(chunks))
+        workdir = tempfile.mkdtemp(prefix="bench_context-")
+        try:
+            store = open_numpy(chunks, emb, workdir)
+            result = evaluate(store, lexical, queries, emb, budget, k)
+            store.close()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        results.append({"chunker": chunker, **result})
+        print(f"{chunker:<8} {result['queries']:>7} " + " ".join(f"{result[c]:>15.3f}" for c in cols))
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tokens saved by context_packer on the FAQ questions")
+    parser.add_argument("--provider", help="embedding provider (default: EMBEDDING_PROVIDER in config.py)")
+    parser.add_argument("--chunkers", type=lambda v: v.split(","), default=list(ingest.CHUNKERS))
+    parser.add_argument("--budget", type=int, default=context_packer.TOKEN_BUDGET)
+    parser.add_argument("-k", type=int, default=6, help="chunks retrieved before packing")
+    args = parser.parse_args()
+    main(args.provider, args.chunkers, args.budget, args.k)
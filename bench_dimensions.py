@@ -0,0 +1,71 @@
+"""
+เปรียบเทียบ embedding ที่ตัดให้สั้นลง (EMBEDDING_DIMENSIONS): ขนาด index, เวลาค้น และ recall@k
+
+สร้าง vector index (backend numpy) ของ corpus ที่แต่ละจำนวนมิติในโฟลเดอร์ชั่วคราว แล้วค้นด้วยคำถามจาก
+data/faq_*.json (กรองด้วย product_id) recall@k เทียบกับผลของจำนวนมิติที่มากที่สุดในรายการ
+
+    python bench_dimensions.py                          # provider ตาม config.py, 256/512/1536 มิติ
+    python bench_dimensions.py --provider hashing --dims 128,256,512
+
+เลือกจำนวนมิติได้แล้วตั้ง EMBEDDING_DIMENSIONS ใน .env และ reindex ด้วย python index.py
+"""
+import os, time, shutil, argparse, tempfile
+
+import numpy as np
+
+import vector_store
+from corpus_store import iter_corpus
+from embeddings import get_embeddings
+from bench_vector_store import load_queries, percentile
+from bench_quantization import run_queries, recall_at_k
+from ingest import CORPUS_FILE
+
+DEFAULT_DIMS = (256, 512, 1536)
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+def main(corpus_file=CORPUS_FILE, provider=None, dims=DEFAULT_DIMS, k=6):
+    items = [it for it in iter_corpus(corpus_file) if not it.get("duplicate_of")]
+    queries = load_queries()
+    print(f"{len(items)} chunks, {len(queries)} FAQ queries, k={k}")
+
+    workdir = tempfile.mkdtemp(prefix="bench_dimensions-")
+    rows, results = [], {}
+    try:
+        for d in sorted(dims, reverse=True):
+            emb = get_embeddings(provider=provider, dimensions=d)
+            path = os.path.join(workdir, str(d))
+            vector_store.build(items, emb, path=path, embedding_info={"provider": provider, "dimensions": d})
+            start = time.perf_counter()
+            query_vectors = [(np.asarray(emb.embed_query(q), dtype=np.float32), pid) for q, pid in queries]
+            embed_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+
+            store = vector_store.NumpyVectorStore(emb, path)
+            results[d], latencies = run_queries(store, query_vectors, k, single_shard=False)
+            rows.append({"dimensions": d, "index_bytes": dir_size(path),
+                         "vector_bytes_per_chunk": store.manifest["bytes_per_chunk"],
+                         "embed_query_ms": embed_ms,
+                         "p50_ms": percentile(latencies, 50), "p99_ms": percentile(latencies, 99)})
+            store.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = results[max(results)]
+    for r in rows:
+        r[f"recall@{k}"] = recall_at_k(results[r["dimensions"]], baseline)
+
+    print(f"{'dims':>5} {'index KB':>9} {'B/chunk':>8} {'embed ms':>9} {'p50 ms':>8} {'p99 ms':>8} {f'recall@{k}':>9}")
+    for r in sorted(rows, key=lambda r: r["dimensions"]):
+        print(f"{r['dimensions']:>5} {r['index_bytes'] / 1024:>9.1f} {r['vector_bytes_per_chunk']:>8.0f} "
+              f"{r['embed_query_ms']:>9.3f} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} {r[f'recall@{k}']:>9.3f}")
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index size, search latency and recall@k per embedding dimension")
+    parser.add_argument("--corpus", default=CORPUS_FILE)
+    parser.add_argument("--provider", help="embedding provider (default: EMBEDDING_PROVIDER in config.py)")
+    parser.add_argument("--dims", type=lambda v: [int(x) for x in v.split(",")], default=list(DEFAULT_DIMS))
+    parser.add_argument("-k", type=int, default=6)
+    args = parser.parse_args()
+    main(args.corpus, args.provider, args.dims, args.k)
@@ -0,0 +1,104 @@
+"""
+Benchmark ของ ingest.py แบบหลาย process
+
+สร้าง catalog สังเคราะห์ (ค่าเริ่มต้น 100k items) ในโฟลเดอร์ชั่วคราว แล้วรัน
+ingest.main() ด้วยจำนวน worker ต่าง ๆ จนถึงจำนวน core ของเครื่อง
+พร้อมตรวจว่า corpus.jsonl ที่ได้เหมือนกันทุก byte
+
+    python bench_ingest.py --items 100000 --items-per-file 200
+"""
+import os, json, time, hashlib, argparse, tempfile, random
+from multiprocessing import cpu_count
+
+import ingest
+
+SHADES = ["00 Fair", "01 Light", "02 Medium", "03 Tan", "Peach", "Lavender", "Green"]
+PHRASES = [
+    "ไม่ติดทน ระหว่างวันต้องเติมบ่อย", "เนื้อบางเบา เกลี่ยง่าย ไม่ตกร่อง",
+    "ล้างออกยากต้องใช้คลีนซิ่งออยล์", "แพ็คเกจถลอก/เสียหายตอนจัดส่ง",
+    "สีสวยเป็นธรรมชาติ เหมาะกับทุกวัน", "ติดต่อ 0812345678 หรือ shop@kage.co",
+]
+
+def make_item(kind, product_id, idx, rng):
+    text = " ".join(rng.choice(PHRASES) for _ in range(rng.randint(3, 12)))
+    if kind == "faq":
+        return {"product_id": product_id, "question": f"คำถามที่ {idx}: {rng.choice(PHRASES)}", "solution": text}
+    if kind == "complaint":
+        return {"product_id": product_id, "complaint": rng.choice(PHRASES), "detail": text}
+    return {
+        "product_id": product_id,
+        "name_th": f"สินค้าทดสอบ {product_id}",
+        "price": f"{rng.randint(99, 599)} บาท",
+        "key_features": [rng.choice(PHRASES) for _ in range(5)],
+        "shades": [{"color_name": s, "description": rng.choice(PHRASES)} for s in SHADES],
+    }
+
+def make_catalog(data_dir, n_items, items_per_file, seed=0):
+    rng = random.Random(seed)
+    kinds = ["faq", "complaint", "product"]
+    written, file_idx = 0, 0
+    while written < n_items:
+        kind = kinds[file_idx % len(kinds)]
+        product_id = f"X{file_idx // len(kinds):05d}"
+        n = min(items_per_file, n_items - written)
+        items = [make_item(kind, product_id, i, rng) for i in range(n)]
+        with open(os.path.join(data_dir, f"{kind}_{product_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False, indent=4)
+        written += n
+        file_idx += 1
+    return file_idx
+
+def worker_counts(max_workers):
+    counts, w = [], 1
+    while w < max_workers:
+        counts.append(w)
+        w *= 2
+    counts.append(max_workers)
+    return counts
+
+def sha256_of(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel ingest on a synthetic catalog")
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--items-per-file", type=int, default=200)
+    parser.add_argument("--max-workers", type=int, default=cpu_count())
+    parser.add_argument("--output", help="optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, "data")
+        os.makedirs(data_dir)
+        n_files = make_catalog(data_dir, args.items, args.items_per_file)
+        print(f"[INFO] Synthetic catalog: {args.items} items in {n_files} files, {cpu_count()} cores")
+
+        results, baseline, digest = [], None, None
+        for workers in worker_counts(args.max_workers):
+            corpus_file = os.path.join(tmp, f"corpus_{workers}.jsonl")
+            manifest_file = os.path.join(tmp, f"manifest_{workers}.json")
+            start = time.perf_counter()
+            ingest.main(workers=workers, data_dir=data_dir, corpus_file=corpus_file, manifest_file=manifest_file)
+            elapsed = time.perf_counter() - start
+
+            baseline = baseline or elapsed
+            file_digest = sha256_of(corpus_file)
+            digest = digest or file_digest
+            results.append({
+                "workers": workers,
+                "seconds": round(elapsed, 3),
+                "speedup": round(baseline / elapsed, 2),
+                "identical_output": file_digest == digest,
+            })
+
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8} {'identical':>10}")
+    for r in results:
+        print(f"{r['workers']:>8} {r['seconds']:>9.3f} {r['speedup']:>7.2f}x {str(r['identical_output']):>10}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"items": args.items, "cores": cpu_count(), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+วัดผลของ quantization ใน vector_index/: memory ต่อ chunk, recall@k และเวลาค้น
+
+recall@k เทียบกับผลค้นแบบ float32 (quantization "none") ด้วยคำถามจาก data/faq_*.json
+แต่ละโหมดวัดทั้งแบบ rescore ผู้สมัครด้วย float32 (ค่าที่ใช้จริง) และแบบไม่ rescore
+
+    python bench_quantization.py                      # hashing provider, ไม่ต้องใช้ network
+    python bench_quantization.py --provider openai    # embedding จริง (ผ่าน cache ของ embeddings.py)
+    python bench_quantization.py --single-shard       # รวมทุก chunk เป็น shard เดียว
+
+shard ของ catalog ตอนนี้มีแค่ ~50 chunk ต่อสินค้า codebook ของ PQ จึงใหญ่กว่าตัว code
+(bytes/chunk ของ pq จะสูงกว่า float32) ใช้ --single-shard หรือ catalog จริงที่ใหญ่กว่าเพื่อดูขนาดที่แท้จริง
+"""
+import time, shutil, argparse, tempfile, os
+
+import numpy as np
+
+import vector_store
+from corpus_store import iter_corpus
+from embeddings import get_embeddings
+from quantization import QUANTIZATIONS
+from bench_vector_store import load_queries, percentile
+from ingest import CORPUS_FILE
+
+def run_queries(store, query_vectors, k, single_shard):
+    results, latencies = [], []
+    for vector, product_id in query_vectors:
+        filter = None if single_shard else {"product_id": product_id}
+        start = time.perf_counter()
+        found = store.search_by_vector(vector, k=k, filter=filter)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([store.shard(name).rows.record(row)["chunk_id"] for name, row, _ in found])
+    return results, latencies
+
+def recall_at_k(results, baseline):
+    scores = [len(set(r) & set(b)) / len(b) for r, b in zip(results, baseline) if b]
+    return sum(scores) / len(scores) if scores else 0.0
+
+def main(corpus_file=CORPUS_FILE, provider="hashing", k=6, single_shard=False):
+    items = [it for it in iter_corpus(corpus_file) if not it.get("duplicate_of")]
+    if single_shard:
+        items = [{**it, "product_id": ""} for it in items]
+    emb = get_embeddings(provider=provider)
+    query_vectors = [(np.asarray(emb.embed_query(q), dtype=np.float32), pid) for q, pid in load_queries()]
+    print(f"{len(items)} chunks, {len(query_vectors)} FAQ queries, k={k}, provider={provider}")
+
+    workdir = tempfile.mkdtemp(prefix="bench_quantization-")
+    rows, baseline = [], None
+    try:
+        for quantization in QUANTIZATIONS:
+            path = os.path.join(workdir, quantization)
+            vector_store.build(items, emb, path=path, quantization=quantization)
+            for rescore in ([0] if quantization == "none" else [vector_store.RESCORE_FACTOR, 0]):
+                store = vector_store.NumpyVectorStore(emb, path, rescore=rescore)
+                results, latencies = run_queries(store, query_vectors, k, single_shard)
+                if baseline is None:
+                    baseline = results
+                rows.append({"quantization": quantization, "rescore": rescore,
+                             "bytes_per_chunk": store.manifest["bytes_per_chunk"],
+                             f"recall@{k}": recall_at_k(results, baseline),
+                             "p50_ms": percentile(latencies, 50), "p99_ms": percentile(latencies, 99)})
+                store.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'mode':<12} {'bytes/chunk':>11} {f'recall@{k}':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for r in rows:
+        mode = r["quantization"] + (f" x{r['rescore']}" if r["rescore"] else "")
+        print(f"{mode:<12} {r['bytes_per_chunk']:>11.0f} {r[f'recall@{k}']:>9.3f} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f}")
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory and recall@k of int8/PQ quantized vector indexes")
+    parser.add_argument("--corpus", default=CORPUS_FILE)
+    parser.add_argument("--provider", default="hashing")
+    parser.add_argument("-k", type=int, default=6)
+    parser.add_argument("--single-shard", action="store_true", help="index every chunk into one shard")
+    args = parser.parse_args()
+    main(args.corpus, args.provider, args.k, args.single_shard)
@@ -0,0 +1,167 @@
+"""
+Benchmark ความแม่นและความเร็วของขั้น retrieval (retrieval.retrieve ที่ answer_question ใช้)
+
+ground truth มาจาก FAQ ใน data/: ทุกรายการมี question คู่กับ solution จึงใช้ question เป็น query
+และนับว่า chunk ที่มาจาก FAQ รายการนั้นเป็นคำตอบที่ถูก (query กรองด้วย product_id แบบหน้าสินค้า)
+วัดทุก chunker ใน ingest.CHUNKERS กับทุก backend (numpy และ Chroma ถ้าติดตั้งไว้) และทุก retrieval mode
+(vector, hybrid) โดยสร้าง index ชั่วคราวของแต่ละชุด รายงาน recall@k, MRR, เวลา p50/p95/p99
+(รวมเวลา embed คำถาม) และสัดส่วนคำถามที่จบที่ lexical fast path
+
+ผลลัพธ์เขียนเป็น JSON (พร้อม commit ของ git; "-dirty" ถ้าโค้ดที่วัดยังไม่ได้ commit) ส่ง --compare ผลครั้งก่อนเพื่อดูว่าอะไรแย่ลง
+
+    python bench_retrieval.py --provider hashing --output bench_results/retrieval.json
+    python bench_retrieval.py --provider hashing --compare bench_results/retrieval.json
+"""
+import os, json, time, shutil, argparse, tempfile, subprocess
+from datetime import datetime, timezone
+
+import ingest
+import vector_store
+import retrieval
+import lexical_index
+from embeddings import get_embeddings
+from bench_vector_store import percentile
+
+BACKENDS = ("numpy", "chroma")
+RECALL_KS = (1, 3, 6)
+# ค่าที่ถือว่าแย่ลงตอน --compare (recall/MRR ลดลง, latency เพิ่มขึ้นเกินสัดส่วนนี้)
+QUALITY_TOLERANCE = 0.01
+LATENCY_TOLERANCE = 0.25
+
+def build_eval_set(chunker, product_mode=ingest.DEFAULT_PRODUCT_MODE, data_dir=ingest.DATA_DIR):
+    """คืน (chunks, queries); query แต่ละอันมี question, product_id และ chunk_id ที่ถูกต้อง"""
+    chunks, queries = [], []
+    for path in ingest.list_data_files(data_dir):
+        fn = os.path.basename(path)
+        for item_idx, item in enumerate(ingest.iter_json_items(path)):
+            item_chunks = list(ingest.iter_chunks(ingest.item_to_docs(fn, item_idx, item, product_mode), chunker))
+            chunks.extend(item_chunks)
+            if item.get("question") and item.get("solution"):
+                queries.append({"question": item["question"], "product_id": item.get("product_id"),
+                                "relevant": {c["chunk_id"] for c in item_chunks}})
+    return chunks, queries
+
+def open_numpy(chunks, emb, workdir):
+    path = os.path.join(workdir, "vector_index")
+    vector_store.build(chunks, emb, path=path)
+    return vector_store.NumpyVectorStore(emb, path)
+
+def open_chroma(chunks, emb, workdir):
+    from langchain.vectorstores import Chroma
+    from index import to_document
+
+    docs = [to_document(c) for c in chunks]
+    return Chroma.from_documents(docs, emb, persist_directory=os.path.join(workdir, "chroma_db"),
+                                 collection_name="bench", ids=[d.metadata["chunk_id"] for d in docs])
+
+OPENERS = {"numpy": open_numpy, "chroma": open_chroma}
+
+def evaluate(store, queries, mode, lexical=None, k=max(RECALL_KS)):
+    ranks, latencies = [], []
+    fast_before = retrieval.stats["lexical_fast_path"]
+    for q in queries:
+        start = time.perf_counter()
+        docs = retrieval.retrieve(q["question"], q["product_id"], k=k, store=store, mode=mode, lexical=lexical)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids = [d.metadata.get("chunk_id") for d in docs]
+        ranks.append(next((i + 1 for i, cid in enumerate(ids) if cid in q["relevant"]), None))
+
+    n = max(len(queries), 1)
+    result = {f"recall@{r}": sum(1 for rank in ranks if rank and rank <= r) / n for r in RECALL_KS}
+    result["mrr"] = sum(1 / rank for rank in ranks if rank) / n
+    for p in (50, 95, 99):
+        result[f"p{p}_ms"] = percentile(latencies, p)
+    result["lexical_fast_path"] = (retrieval.stats["lexical_fast_path"] - fast_before) / n
+    result["queries"] = len(queries)
+    return result
+
+def git_commit(output=None):
+    """commit ที่ผลนี้มาจาก ต่อท้าย "-dirty" ถ้ามีไฟล์ที่ track ไว้ถูกแก้แต่ยังไม่ commit (ยกเว้นไฟล์ผลลัพธ์เอง)"""
+    def git(*args):
+        return subprocess.run(["git", *args], capture_output=True, text=True, cwd=ingest.BASE_DIR,
+                              check=True).stdout
+    try:
+        commit = git("rev-parse", "--short", "HEAD").strip()
+        changed = [line[3:] for line in git("status", "--porcelain", "--untracked-files=no").splitlines()]
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    own = os.path.relpath(os.path.abspath(output), ingest.BASE_DIR) if output else None
+    return commit + ("-dirty" if any(path != own for path in changed) else "")
+
+def compare(results, previous):
+    """รายการ metric ที่แย่กว่าผลครั้งก่อน"""
+    old = {(r["chunker"], r["backend"], r.get("mode", "vector")): r for r in previous["results"]}
+    regressions = []
+    for r in results:
+        before = old.get((r["chunker"], r["backend"], r["mode"]))
+        if not before:
+            continue
+        for key, value in r.items():
+            if key not in before or not isinstance(value, float) or key == "lexical_fast_path":
+                continue
+            if key.endswith("_ms"):
+                worse = value > before[key] * (1 + LATENCY_TOLERANCE)
+            else:
+                worse = value < before[key] - QUALITY_TOLERANCE
+            if worse:
+                regressions.append(f"{r['chunker']}/{r['backend']}/{r['mode']} {key}: {before[key]:.3f} -> {value:.3f}")
+    return regressions
+
+def main(provider=None, chunkers=ingest.CHUNKERS, backends=BACKENDS, modes=retrieval.RETRIEVAL_MODES,
+         output=None, compare_file=None):
+    emb = get_embeddings(provider=provider)
+    results = []
+    for chunker in chunkers:
+        chunks, queries = build_eval_set(chunker)
+        lexical = lexical_index.LexicalIndex(lexical_index.build_index(chunks))
+        for backend in backends:
+            workdir = tempfile.mkdtemp(prefix="bench_retrieval-")
+            try:
+                store = OPENERS[backend](chunks, emb, workdir)
+            except ImportError as e:
+                print(f"[WARN] {backend} skipped: {e}")
+                shutil.rmtree(workdir, ignore_errors=True)
+                continue
+            try:
+                for mode in modes:
+                    result = evaluate(store, queries, mode, lexical)
+                    results.append({"chunker": chunker, "backend": backend, "mode": mode, "chunks": len(chunks),
+                                    **result})
+            finally:
+                if hasattr(store, "close"):
+                    store.close()
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    cols = [f"recall@{r}" for r in RECALL_KS] + ["mrr", "p50_ms", "p95_ms", "p99_ms", "lexical_fast_path"]
+    print(f"{'chunker':<8} {'backend':<8} {'mode':<7} {'chunks':>6} " + " ".join(f"{c[:9]:>9}" for c in cols))
+    for r in results:
+        print(f"{r['chunker']:<8} {r['backend']:<8} {r['mode']:<7} {r['chunks']:>6} "
+              + " ".join(f"{r[c]:>9.3f}" for c in cols))
+
+    report = {"commit": git_commit(output), "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+              "provider": provider or getattr(emb, "model", type(emb).__name__), "results": results}
+    if output:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[INFO] Wrote {output}")
+    if compare_file:
+        with open(compare_file, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        regressions = compare(results, previous)
+        print(f"[INFO] Compared with {compare_file} ({previous.get('commit')}): "
+              + ("no regressions" if not regressions else f"{len(regressions)} regressions"))
+        for line in regressions:
+            print(f"  {line}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@k, MRR and latency of retrieval on the FAQ ground truth")
+    parser.add_argument("--provider", help="embedding provider (default: EMBEDDING_PROVIDER in config.py)")
+    parser.add_argument("--chunkers", type=lambda v: v.split(","), default=list(ingest.CHUNKERS))
+    parser.add_argument("--backends", type=lambda v: v.split(","), default=list(BACKENDS))
+    parser.add_argument("--modes", type=lambda v: v.split(","), default=list(retrieval.RETRIEVAL_MODES))
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="previous JSON results to check for regressions")
+    args = parser.parse_args()
+    main(args.provider, args.chunkers, args.backends, args.modes, args.output, args.compare)
@@ -0,0 +1,128 @@
+"""
+Benchmark ของ vector store: NumPy/FAISS ใน process เทียบกับ Chroma
+
+ใช้คำถาม FAQ ทุกไฟล์ใน data/ (ชุดเดียวกับ bench_retrieval.py) เป็น query (กรองด้วย product_id ของคำถามนั้นแบบที่ answer_question ทำ)
+และใช้ embedding provider "hashing" เพื่อให้รันได้โดยไม่ต้องใช้ network
+เวลา embed query ไม่ถูกนับ วัดเฉพาะเวลาโหลด index และเวลาค้น
+
+--scale คัดลอก catalog เป็นหลายชุด (product_id ใหม่ทุกชุด) เพื่อดูว่าเวลาค้นของหน้าสินค้า
+คงที่เมื่อจำนวนสินค้าเพิ่มขึ้น เพราะแต่ละ query ค้นแค่ shard ของสินค้านั้น
+
+    python bench_vector_store.py --repeat 20
+    python bench_vector_store.py --scale 1,10,100,1000
+"""
+import os, time, shutil, argparse, tempfile, statistics
+
+import numpy as np
+
+import vector_store
+from corpus_store import iter_corpus
+from embeddings import HashingEmbeddings
+from ingest import CORPUS_FILE, DATA_DIR, DEFAULT_CHUNKER
+
+def load_queries(data_dir=DATA_DIR):
+    """[(question, product_id)] ของ FAQ ทุกไฟล์ ชุดเดียวกับที่ bench_retrieval.py ใช้"""
+    # import ตอนเรียก: bench_retrieval import percentile จาก module นี้
+    from bench_retrieval import build_eval_set
+    _, queries = build_eval_set(DEFAULT_CHUNKER, data_dir=data_dir)
+    return [(q["question"], q["product_id"]) for q in queries]
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def time_search(search, query_vectors, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for vector, product_id in query_vectors:
+            start = time.perf_counter()
+            search(vector, {"product_id": product_id})
+            latencies.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": percentile(latencies, 50), "p99_ms": percentile(latencies, 99),
+            "mean_ms": statistics.fmean(latencies), "searches": len(latencies)}
+
+def bench_numpy(items, emb, query_vectors, workdir, k, repeat):
+    path = os.path.join(workdir, "vector_index")
+    vector_store.build(items, emb, path=path)
+    start = time.perf_counter()
+    store = vector_store.NumpyVectorStore(emb, path)
+    load_ms = (time.perf_counter() - start) * 1000
+    try:
+        result = time_search(lambda v, f: store.search_by_vector(v, k=k, filter=f), query_vectors, repeat)
+    finally:
+        store.close()
+    return {"load_ms": load_ms, "shards": len(store.manifest["shards"]), **result}
+
+def bench_chroma(items, emb, query_vectors, workdir, k, repeat):
+    try:
+        from langchain.vectorstores import Chroma
+        from index import to_document
+    except ImportError as e:
+        print(f"[WARN] Chroma benchmark skipped: {e}")
+        return None
+
+    path = os.path.join(workdir, "chroma_db")
+    docs = [to_document(it) for it in items]
+    Chroma.from_documents(docs, emb, persist_directory=path, collection_name="bench",
+                          ids=[d.metadata["chunk_id"] for d in docs])
+    start = time.perf_counter()
+    db = Chroma(persist_directory=path, embedding_function=emb, collection_name="bench")
+    load_ms = (time.perf_counter() - start) * 1000
+    result = time_search(lambda v, f: db.similarity_search_by_vector(v, k=k, filter=f), query_vectors, repeat)
+    return {"load_ms": load_ms, **result}
+
+def scale_catalog(items, copies):
+    """catalog ขนาด copies เท่า: ชุดที่ i > 0 ใช้ product_id "<id>-<i>" """
+    scaled = list(items)
+    for i in range(1, copies):
+        for it in items:
+            if it.get("product_id"):
+                scaled.append({**it, "product_id": f"{it['product_id']}-{i}", "chunk_id": f"{it['chunk_id']}-{i}"})
+    return scaled
+
+def bench_scale(items, emb, query_vectors, copies_list, k, repeat):
+    print(f"{'products':>8} {'chunks':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    results = []
+    for copies in copies_list:
+        scaled = scale_catalog(items, copies)
+        workdir = tempfile.mkdtemp(prefix="bench_vector_store-")
+        try:
+            r = bench_numpy(scaled, emb, query_vectors, workdir, k, repeat)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        r["chunks"] = len(scaled)
+        results.append(r)
+        print(f"{r['shards']:>8} {r['chunks']:>8} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f}")
+    return results
+
+def main(corpus_file=CORPUS_FILE, k=6, repeat=20, scale=None):
+    items = [it for it in iter_corpus(corpus_file) if not it.get("duplicate_of")]
+    emb = HashingEmbeddings()
+    queries = load_queries()
+    query_vectors = [(np.asarray(emb.embed_query(q), dtype=np.float32), pid) for q, pid in queries]
+    print(f"{len(items)} chunks, {len(queries)} FAQ queries x {repeat}, k={k}")
+    if scale:
+        return bench_scale(items, emb, query_vectors, scale, k, repeat)
+
+    workdir = tempfile.mkdtemp(prefix="bench_vector_store-")
+    try:
+        results = {"numpy": bench_numpy(items, emb, query_vectors, workdir, k, repeat),
+                   "chroma": bench_chroma(items, emb, query_vectors, workdir, k, repeat)}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'backend':<8} {'load ms':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, r in results.items():
+        if r:
+            print(f"{name:<8} {r['load_ms']:>9.2f} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare NumPy/FAISS and Chroma vector search latency")
+    parser.add_argument("--corpus", default=CORPUS_FILE)
+    parser.add_argument("-k", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--scale", type=lambda v: [int(x) for x in v.split(",")],
+                        help="comma-separated catalog copies, e.g. 1,10,100 (numpy backend only)")
+    args = parser.parse_args()
+    main(args.corpus, args.k, args.repeat, args.scale)
@@ -0,0 +1,72 @@
+"""
+แชทของหน้าสินค้า (pages/1_–5_) ที่ใช้ร่วมกัน: แสดงประวัติแชทและตอบคำถามหนึ่งรอบแบบ streaming
+
+ใต้คำตอบแต่ละข้อแสดง TTFT (เวลาตั้งแต่ส่งคำถามจนข้อความส่วนแรกของคำตอบขึ้น รวม FAQ, answer cache,
+retrieval และ context packing) และแหล่งข้อมูลที่ใช้ตอบ ค่าทั้งสองเก็บในประวัติแชทใน session_state ด้วย
+"""
+import time
+from datetime import datetime
+
+import streamlit as st
+
+USER_AVATAR = "🙋‍♀️"
+ASSISTANT_AVATAR = "💖"
+
+def _time_html(timestamp):
+    return f"<span style='font-size: 0.8em; color: gray;'>({timestamp})</span>"
+
+def format_details(message):
+    """บรรทัด TTFT และแหล่งข้อมูลใต้คำตอบ ("" ถ้าไม่มี)"""
+    parts = []
+    if message.get("ttft") is not None:
+        parts.append(f"TTFT {message['ttft']:.2f} วินาที")
+    files = list(dict.fromkeys(s["source_file"] for s in message.get("sources") or [] if s.get("source_file")))
+    if files:
+        parts.append("แหล่งข้อมูล: " + ", ".join(files))
+    return " · ".join(parts)
+
+def display_message(message):
+    st.markdown(f"{_time_html(message.get('time', ''))} {message['content']}", unsafe_allow_html=True)
+    details = format_details(message)
+    if details:
+        st.caption(details)
+
+def show_history(messages):
+    for msg in messages:
+        avatar = ASSISTANT_AVATAR if msg["role"] == "assistant" else USER_AVATAR
+        with st.chat_message(msg["role"], avatar=avatar):
+            display_message(msg)
+
+def answer_turn(messages, prompt, answer_stream):
+    """
+    ตอบ prompt หนึ่งรอบ แสดงผล และเพิ่มคำถาม/คำตอบลง messages (ประวัติแชทใน session_state)
+    answer_stream: ฟังก์ชัน question -> rag_runtime.AnswerStream ของหน้านั้น
+    """
+    submitted = time.perf_counter()
+    user_msg = {"role": "user", "content": prompt, "sources": [], "time": datetime.now().strftime("%H:%M")}
+    messages.append(user_msg)
+    with st.chat_message("user", avatar=USER_AVATAR):
+        display_message(user_msg)
+
+    with st.chat_message("assistant", avatar=ASSISTANT_AVATAR):
+        with st.spinner("กำลังดึงข้อมูลและตอบคำถาม..."):
+            stream = answer_stream(prompt)
+        stream.started = submitted
+        assistant_time = datetime.now().strftime("%H:%M")
+
+        # แสดงคำตอบทีละส่วนตามที่ LLM ส่งมา แล้วค่อยเก็บข้อความเต็มพร้อม sources/TTFT ลงประวัติแชท
+        st.markdown(_time_html(assistant_time), unsafe_allow_html=True)
+        st.write_stream(iter(stream))
+        msg = {
+            "role": "assistant",
+            "content": stream.answer,
+            "context_used": True,
+            "sources": stream.sources,
+            "ttft": stream.first_token_seconds,
+            "time": assistant_time,
+        }
+        details = format_details(msg)
+        if details:
+            st.caption(details)
+    messages.append(msg)
+    return msg
@@ -0,0 +1,58 @@
+"""
+เปรียบเทียบ chunker ใน ingest.py บนข้อมูลใน data/
+
+รายงานจำนวน chunk, การกระจายของขนาด chunk (token) และจำนวน token รวมที่ต้องส่งไป embed
+
+    python chunk_report.py [--output report.json]
+"""
+import json, argparse, statistics
+
+import ingest
+from token_count import count_tokens, tokenizer_name
+
+def percentile(values, q):
+    if not values:
+        return 0
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+    return values[idx]
+
+def chunker_stats(docs, chunker):
+    tokens = [count_tokens(c) for d in docs for c in ingest.make_chunks(d["content"], chunker)]
+    return {
+        "chunker": chunker,
+        "chunks": len(tokens),
+        "total_tokens": sum(tokens),
+        "mean": round(statistics.mean(tokens), 1) if tokens else 0,
+        "stdev": round(statistics.pstdev(tokens), 1) if tokens else 0,
+        "min": min(tokens, default=0),
+        "p50": percentile(tokens, 50),
+        "p90": percentile(tokens, 90),
+        "max": max(tokens, default=0),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare chunk size distributions of the ingest chunkers")
+    parser.add_argument("--data-dir", default=ingest.DATA_DIR)
+    parser.add_argument("--output", help="optional path to write the report as JSON")
+    args = parser.parse_args()
+
+    docs = ingest.load_all_json(args.data_dir)
+    report = {
+        "tokenizer": tokenizer_name(),
+        "docs": len(docs),
+        "chunkers": [chunker_stats(docs, c) for c in ingest.CHUNKERS],
+    }
+
+    print(f"[INFO] {report['docs']} docs, token counts from {report['tokenizer']}")
+    cols = ["chunker", "chunks", "total_tokens", "mean", "stdev", "min", "p50", "p90", "max"]
+    print(" ".join(f"{c:>12}" for c in cols))
+    for row in report["chunkers"]:
+        print(" ".join(f"{row[c]:>12}" for c in cols))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
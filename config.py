@@ -2,8 +2,45 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
+# MODEL ใช้เฉพาะเครื่องมือ tc_* (ตรวจว่าตั้งไว้ที่นั่น) หน้าแชท/RAG ที่ import config จึงไม่ต้องตั้ง
 MODEL = os.getenv("MODEL")
-assert MODEL, "Set MODEL in .env (e.g., groq/openai/gpt-oss-120b)"
-
 EMBED_MODEL = os.getenv("EMBED_MODEL")
-assert MODEL, "Set EMBED_MODEL in .env (e.g., groq/openai/gpt-oss-120b)"
+
+# RAG embedding backend (index.py, query.py และหน้าสินค้าต้องใช้ค่าเดียวกัน)
+# - openai:  OpenAIEmbeddings ผ่าน API (ต้องมี OPENAI_API_KEY)
+# - hashing: feature hashing ของ character n-gram บน CPU ไม่ต้องใช้ network
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+# ความยาวเวกเตอร์ (เช่น 256, 512); ว่าง/0 = ขนาดเต็มของ model (1536 สำหรับ text-embedding-3-small)
+# เปลี่ยนค่านี้แล้วต้อง reindex: python index.py (collection/index แยกตามจำนวนมิติ)
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS") or 0)
+
+# ที่เก็บเวกเตอร์ที่ answer_question ใช้ค้น
+# - chroma: chroma_db/ (ค่าเดิม)
+# - numpy:  vector_index/ เมทริกซ์ float32 แบบ mmap ใน process (ใช้ FAISS เมื่อ corpus ใหญ่)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+
+# การบีบเวกเตอร์ของ backend numpy (index.py --backend numpy): none, int8 หรือ pq
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")
+
+# retrieval ของ answer_question (retrieval.py)
+# - hybrid: BM25 (lexical_index.json) + เวกเตอร์ด้วย reciprocal-rank fusion, ข้ามการ embed เมื่อ BM25 มั่นใจ
+# - vector: ค้นเวกเตอร์อย่างเดียว
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+
+# จำนวนเวกเตอร์คำถามที่เก็บใน memory ของ process (embeddings.QueryEmbeddingCache, 0 = ปิด)
+# provider openai เก็บไว้บนดิสก์ใน .cache/embeddings.sqlite อีกชั้นด้วย
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE") or 4096)
+
+# token สูงสุดของ context ที่ส่งให้ LLM (context_packer.py ตัดส่วนซ้ำ/ไม่เกี่ยวข้องก่อนแล้วค่อยตัดตาม budget)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET") or 1500)
+
+# cache คำตอบของ answer_question (answer_cache.py): จำนวนคำตอบสูงสุด (0 = ปิด), อายุเป็นวินาที
+# และ cosine similarity ขั้นต่ำของคำถามที่ถือว่าเป็นคำถามเดียวกัน (0 = ใช้แค่คำถามที่ตรงกันหลัง normalize)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE") or 1000)
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL") or 6 * 3600)
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD") or 0.95)
+
+# ตอบคำถามที่ตรงกับ FAQ ด้วย solution ที่เก็บไว้เลยโดยไม่เรียก LLM (faq_index.py)
+# confidence 0–1 (ความเหมือนของตัวอักษร + embedding) ค่ายิ่งต่ำยิ่งตอบตรงบ่อยขึ้น, มากกว่า 1 = ปิด
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD") or 0.85)
@@ -0,0 +1,173 @@
+"""
+ประกอบ context ของ prompt จาก chunk ที่ retrieval คืนมา (แทนการต่อทุก chunk ตรง ๆ ของ build_prompt เดิม)
+
+1. ตัดข้อความซ้ำ: ช่วงคำ (ตัดคำด้วย newmm แบบเดียวกับตอน chunk) ที่ยาวตั้งแต่ SPAN_WORDS คำติดกันและเคยอยู่
+   ใน chunk ที่เลือกไปแล้ว (เช่น overlap 50 คำของ chunk_text) ถูกตัดออก chunk ที่ไม่เหลือข้อความใหม่เลยถูกทิ้ง
+2. ทิ้ง chunk ที่ cosine similarity กับคำถามต่ำกว่า MIN_SIMILARITY หรือต่ำกว่า RELATIVE_CUTOFF เท่าของ chunk
+   ที่ใกล้ที่สุด (จำนวน chunk จึงปรับตามคำถาม ไม่ตายตัวที่ k) แต่ chunk ที่ใกล้ที่สุดอยู่เสมอ และเกณฑ์
+   แบบสัดส่วนใช้เฉพาะเมื่อ similarity สูงสุด > 0 (ไม่อย่างนั้นคูณแล้วเกณฑ์กลับสูงกว่าตัวเอง)
+3. เรียงด้วย MMR: เลือก chunk ที่เกี่ยวกับคำถามมากและไม่ซ้ำกับที่เลือกไปแล้ว (FAQ ที่แทบเหมือนกันได้ที่เดียว)
+4. ใส่ได้ไม่เกิน token budget (นับด้วย token_count เหมือนตอน chunk)
+
+ถ้าไม่ได้ส่ง embedding มา หรือ retrieval ตอบจาก lexical fast path (ไม่ได้ embed คำถาม) จะข้ามข้อ 2–3
+และใช้ลำดับเดิมของ retrieval ข้อ 2–3 ใช้เวกเตอร์คำถาม (query_vector ของ retrieval.Retrieved) และเวกเตอร์
+ของ chunk (Hit.vector จาก NumpyVectorStore) ที่มีอยู่แล้ว embed เฉพาะส่วนที่ขาด (เช่น ผลจาก Chroma/BM25)
+"""
+import unicodedata
+
+import numpy as np
+
+from hits import Hit
+from embeddings import unit_vectors
+from token_count import count_tokens
+
+TOKEN_BUDGET = 1500
+SPAN_WORDS = 8
+MIN_SIMILARITY = 0.0
+RELATIVE_CUTOFF = 0.6
+MMR_LAMBDA = 0.7
+REDUNDANT_SIMILARITY = 0.97  # chunk ที่เหมือนกับที่เลือกแล้วขนาดนี้ถือว่าซ้ำ
+GAP = " … "
+
+stats = {"queries": 0, "tokens_in": 0, "tokens_out": 0}
+
+def format_context(docs):
+    context = ""
+    for idx, doc in enumerate(docs, 1):
+        meta = getattr(doc, "metadata", {}) or {}
+        context += f"[{idx}] ({meta.get('source_file', 'unknown')}) {getattr(doc, 'page_content', str(doc))}\n"
+    return context
+
+def _norm(word):
+    return unicodedata.normalize("NFC", word).casefold()
+
+def tokens(text):
+    """คำ newmm ของข้อความรวมช่องว่าง ("".join ได้ข้อความเดิม)"""
+    from pythainlp.tokenize import word_tokenize
+    return word_tokenize(text, engine="newmm", keep_whitespace=True)
+
+def word_keys(toks):
+    return [_norm(t) for t in toks if not t.isspace()]
+
+def _spans(words):
+    return {tuple(words[i:i + SPAN_WORDS]) for i in range(len(words) - SPAN_WORDS + 1)}
+
+def novel_text(text, seen_spans, seen_texts, toks=None):
+    """ข้อความของ chunk หลังตัดช่วงที่ซ้ำกับ chunk ก่อนหน้า ("" ถ้าไม่เหลือข้อความใหม่)"""
+    toks = tokens(text) if toks is None else toks
+    keys = word_keys(toks)
+    if len(keys) < SPAN_WORDS:
+        return "" if " ".join(keys) in seen_texts else text
+    covered = [False] * len(keys)
+    for i in range(len(keys) - SPAN_WORDS + 1):
+        if tuple(keys[i:i + SPAN_WORDS]) in seen_spans:
+            covered[i:i + SPAN_WORDS] = [True] * SPAN_WORDS
+    if not any(covered):
+        return text
+    parts, run, w = [], [], 0
+    for tok in toks:
+        if tok.isspace():
+            run.append(tok)
+            continue
+        if covered[w]:
+            if "".join(run).strip():
+                parts.append("".join(run).strip())
+            run = []
+        else:
+            run.append(tok)
+        w += 1
+    if "".join(run).strip():
+        parts.append("".join(run).strip())
+    return GAP.join(parts)
+
+def doc_vectors(docs, embedding):
+    """เวกเตอร์ของแต่ละ chunk: ใช้ Hit.vector ที่ store คืนมา embed เฉพาะ chunk ที่ไม่มี"""
+    vectors = [getattr(d, "vector", None) for d in docs]
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    if missing:
+        for i, vec in zip(missing, embedding.embed_documents([docs[i].page_content for i in missing])):
+            vectors[i] = vec
+    return unit_vectors(np.stack([np.asarray(v, dtype=np.float32) for v in vectors]))
+
+def mmr_order(query_vec, doc_vecs, candidates):
+    """ลำดับของ candidates ตาม maximal marginal relevance"""
+    relevance = doc_vecs @ query_vec
+    order, remaining = [], list(candidates)
+    while remaining:
+        if order:
+            redundancy = (doc_vecs[remaining] @ doc_vecs[order].T).max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining))
+        scores = MMR_LAMBDA * relevance[remaining] - (1 - MMR_LAMBDA) * redundancy
+        best = int(np.argmax(scores))
+        if order and redundancy[best] >= REDUNDANT_SIMILARITY:
+            remaining.pop(best)
+            continue
+        order.append(remaining.pop(best))
+    return order
+
+def _truncate(text, budget):
+    toks = tokens(text)
+    while toks and count_tokens("".join(toks)) > budget:
+        toks = toks[:max(1, len(toks) * 3 // 4)] if len(toks) > 1 else []
+    return "".join(toks).strip()
+
+def pack(question, docs, embedding=None, budget=TOKEN_BUDGET):
+    """
+    คืน (docs, context, report)
+    docs คือ chunk ที่ใช้จริงตามลำดับใน context (page_content อาจถูกตัดส่วนที่ซ้ำออก ใช้ทำ sources ได้)
+    report มีจำนวน token ก่อน/หลัง (เทียบกับต่อทุก chunk แบบเดิม) และจำนวน chunk ที่ถูกทิ้งแต่ละเหตุผล
+    """
+    mode, query_vector = getattr(docs, "mode", None), getattr(docs, "query_vector", None)
+    docs = list(docs)
+    report = {"chunks_in": len(docs), "tokens_in": count_tokens(format_context(docs)),
+              "dropped_similarity": 0, "dropped_redundant": 0, "dropped_budget": 0}
+
+    order = list(range(len(docs)))
+    # lexical fast path: BM25 มั่นใจแล้วและไม่ได้ embed คำถาม ไม่ต้อง embed เพื่อกรองซ้ำ
+    if embedding is not None and docs and mode != "lexical_fast_path":
+        query_vec = unit_vectors(embedding.embed_query(question) if query_vector is None else query_vector)
+        doc_vecs = doc_vectors(docs, embedding)
+        relevance = doc_vecs @ query_vec
+        top = int(np.argmax(relevance))
+        cutoff = max(MIN_SIMILARITY, float(relevance[top]) * RELATIVE_CUTOFF) if relevance[top] > 0 else MIN_SIMILARITY
+        # similarity ทุกตัว <= 0 (เช่น hashing embedding กับคำถามที่ไม่มี n-gram ร่วม) ยังตอบจาก chunk ที่ดีที่สุด
+        candidates = [i for i in order if relevance[i] >= cutoff or i == top]
+        report["dropped_similarity"] = len(order) - len(candidates)
+        order = mmr_order(query_vec, doc_vecs, candidates)
+        report["dropped_redundant"] = len(candidates) - len(order)
+
+    packed, used = [], 0
+    seen_spans, seen_texts = set(), set()
+    for i in order:
+        doc = docs[i]
+        meta = dict(getattr(doc, "metadata", {}) or {})
+        toks = tokens(doc.page_content)
+        text = novel_text(doc.page_content, seen_spans, seen_texts, toks)
+        if not text.strip():
+            report["dropped_redundant"] += 1
+            continue
+        cost = count_tokens(format_context([Hit(text, meta, 0.0)]))
+        if used + cost > budget:
+            if packed:
+                report["dropped_budget"] += 1
+                continue
+            # chunk แรกยาวเกิน budget: ใช้แค่ส่วนต้นที่พอดี
+            text = _truncate(text, budget - (cost - count_tokens(text)))
+            if not text:
+                report["dropped_budget"] += 1
+                continue
+            cost = count_tokens(format_context([Hit(text, meta, 0.0)]))
+        keys = word_keys(toks)
+        seen_spans |= _spans(keys)
+        seen_texts.add(" ".join(keys))
+        packed.append(Hit(text, meta, getattr(doc, "score", 0.0)))
+        used += cost
+
+    context = format_context(packed)
+    report.update(chunks_out=len(packed), tokens_out=count_tokens(context))
+    report["tokens_saved"] = report["tokens_in"] - report["tokens_out"]
+    stats["queries"] += 1
+    stats["tokens_in"] += report["tokens_in"]
+    stats["tokens_out"] += report["tokens_out"]
+    return packed, context, report
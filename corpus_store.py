@@ -0,0 +1,222 @@
+"""
+Corpus แบบ binary ที่ mmap ได้ + ตาราง offset สำหรับเปิดอ่าน chunk ทีละตัว
+
+corpus.jsonl ต้อง parse ทั้งไฟล์ก่อนใช้งาน ไฟล์นี้เก็บ chunk เดิมแต่เพิ่ม
+hash table ของ chunk_id และรายการ chunk ของแต่ละ product_id ไว้ท้ายไฟล์
+จึงดึง chunk ใดก็ได้ใน O(1) โดย parse JSON เฉพาะ record ที่อ่าน
+
+Layout (little-endian):
+    MAGIC
+    records        JSON ของแต่ละ chunk (UTF-8) ต่อกัน
+    record table   [offset u64, length u32] ตามลำดับใน corpus
+    id table       open-addressing hash table: [key 16B, ordinal+1 u32]
+    postings       ordinal u32 ของแต่ละ product เรียงต่อกัน
+    products       JSON {product_id: [start, count]} ชี้เข้า postings
+    footer         FOOTER struct
+
+    python corpus_store.py build
+    python corpus_store.py get <chunk_id>
+    python corpus_store.py product <product_id>
+"""
+import os, sys, json, mmap, struct, hashlib, argparse
+from array import array
+from uuid import UUID
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_FILE = os.path.join(BASE_DIR, "corpus.jsonl")
+STORE_FILE = os.path.join(BASE_DIR, "corpus.bin")
+
+MAGIC = b"KAGECRP1"
+RECORD = struct.Struct("<QI")
+SLOT = struct.Struct("<16sI")
+# records_start, n_records, record_table, id_table, id_slots, postings, products, products_len, magic
+FOOTER = struct.Struct("<QQQQQQQQ8s")
+EMPTY_KEY = bytes(16)
+
+def chunk_key(chunk_id):
+    """chunk_id เป็น uuid อยู่แล้วจึงใช้ 16 byte ของมันตรง ๆ; id รูปแบบอื่นใช้ md5 แทน"""
+    try:
+        key = UUID(chunk_id).bytes
+    except ValueError:
+        key = hashlib.md5(chunk_id.encode("utf-8")).digest()
+    return key if key != EMPTY_KEY else hashlib.md5(key).digest()
+
+def table_size(n):
+    size = 8
+    while size < n * 2:
+        size *= 2
+    return size
+
+def build_store(corpus_file=CORPUS_FILE, store_file=STORE_FILE, quiet=False):
+    offsets, lengths = array("Q"), array("I")
+    keys = []
+    postings = {}
+
+    tmp = store_file + ".tmp"
+    with open(corpus_file, "r", encoding="utf-8") as src, open(tmp, "wb") as out:
+        out.write(MAGIC)
+        for line in src:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            data = line.encode("utf-8")
+            ordinal = len(offsets)
+            offsets.append(out.tell())
+            lengths.append(len(data))
+            out.write(data)
+            keys.append(chunk_key(item["chunk_id"]))
+            postings.setdefault(item.get("product_id") or "", array("I")).append(ordinal)
+
+        n = len(offsets)
+        record_table = out.tell()
+        for off, length in zip(offsets, lengths):
+            out.write(RECORD.pack(off, length))
+
+        slots = table_size(n)
+        mask = slots - 1
+        table = bytearray(SLOT.size * slots)
+        for ordinal, key in enumerate(keys):
+            slot = int.from_bytes(key[:8], "little") & mask
+            while table[slot * SLOT.size:slot * SLOT.size + 16] != EMPTY_KEY:
+                slot = (slot + 1) & mask
+            SLOT.pack_into(table, slot * SLOT.size, key, ordinal + 1)
+        id_table = out.tell()
+        out.write(table)
+
+        postings_start = out.tell()
+        directory = {}
+        start = 0
+        for product_id in sorted(postings):
+            ords = postings[product_id]
+            directory[product_id] = [start, len(ords)]
+            out.write(ords.tobytes() if sys.byteorder == "little" else _swapped(ords))
+            start += len(ords)
+
+        products = out.tell()
+        products_data = json.dumps(directory, ensure_ascii=False).encode("utf-8")
+        out.write(products_data)
+        out.write(FOOTER.pack(len(MAGIC), n, record_table, id_table, slots,
+                              postings_start, products, len(products_data), MAGIC))
+    os.replace(tmp, store_file)
+    if not quiet:
+        print(f"[INFO] Wrote {n} chunks to {store_file}")
+    return n
+
+def _swapped(arr):
+    arr = array(arr.typecode, arr)
+    arr.byteswap()
+    return arr.tobytes()
+
+class CorpusStore:
+    """อ่าน corpus.bin ผ่าน mmap; ไม่มีการ parse จนกว่าจะขอ chunk นั้น"""
+
+    def __init__(self, store_file=STORE_FILE):
+        self.path = store_file
+        self._file = open(store_file, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (_, self._n, self._record_table, self._id_table, self._id_slots,
+         self._postings, products, products_len, magic) = FOOTER.unpack_from(self._mm, len(self._mm) - FOOTER.size)
+        if magic != MAGIC or self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{store_file} is not a corpus store")
+        self._products = json.loads(self._mm[products:products + products_len].decode("utf-8"))
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._n
+
+    def _raw(self, ordinal):
+        off, length = RECORD.unpack_from(self._mm, self._record_table + ordinal * RECORD.size)
+        return self._mm[off:off + length]
+
+    def record(self, ordinal):
+        return json.loads(self._raw(ordinal).decode("utf-8"))
+
+    def ordinal(self, chunk_id):
+        key = chunk_key(chunk_id)
+        mask = self._id_slots - 1
+        slot = int.from_bytes(key[:8], "little") & mask
+        while True:
+            slot_key, ordinal = SLOT.unpack_from(self._mm, self._id_table + slot * SLOT.size)
+            if slot_key == EMPTY_KEY:
+                return None
+            if slot_key == key:
+                return ordinal - 1
+            slot = (slot + 1) & mask
+
+    def get(self, chunk_id, default=None):
+        ordinal = self.ordinal(chunk_id)
+        return default if ordinal is None else self.record(ordinal)
+
+    def __contains__(self, chunk_id):
+        return self.ordinal(chunk_id) is not None
+
+    def product_ids(self):
+        return [p or None for p in self._products]
+
+    def product_ordinals(self, product_id):
+        start, count = self._products.get(product_id or "", [0, 0])
+        ords = array("I")
+        base = self._postings + start * ords.itemsize
+        ords.frombytes(self._mm[base:base + count * ords.itemsize])
+        if sys.byteorder != "little":
+            ords.byteswap()
+        return ords
+
+    def iter_product(self, product_id):
+        for ordinal in self.product_ordinals(product_id):
+            yield self.record(ordinal)
+
+    def __iter__(self):
+        for ordinal in range(self._n):
+            yield self.record(ordinal)
+
+def iter_corpus(path=CORPUS_FILE):
+    """อ่าน chunk จาก corpus.jsonl หรือ corpus.bin ก็ได้"""
+    if path.endswith(".bin"):
+        with CorpusStore(path) as store:
+            yield from store
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the binary corpus store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="convert corpus.jsonl to corpus.bin")
+    build.add_argument("--corpus", default=CORPUS_FILE)
+    build.add_argument("--store", default=STORE_FILE)
+    get = sub.add_parser("get", help="print one chunk by chunk_id")
+    get.add_argument("chunk_id")
+    get.add_argument("--store", default=STORE_FILE)
+    product = sub.add_parser("product", help="print every chunk of a product_id")
+    product.add_argument("product_id")
+    product.add_argument("--store", default=STORE_FILE)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_store(args.corpus, args.store)
+        return
+    with CorpusStore(args.store) as store:
+        if args.command == "get":
+            chunk = store.get(args.chunk_id)
+            if chunk is None:
+                sys.exit(f"chunk_id not found: {args.chunk_id}")
+            print(json.dumps(chunk, ensure_ascii=False, indent=2))
+        else:
+            for chunk in store.iter_product(args.product_id):
+                print(json.dumps(chunk, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+ตัด chunk ที่แทบจะซ้ำกันภายในสินค้าเดียวกัน (MinHash + LSH)
+
+ไฟล์ FAQ/complaint มักมีประโยคซ้ำ ๆ กัน (เช่น "ไม่ติดทน") ทุกก้อนถูก embed และ index แยกกัน
+dedup_corpus() อ่าน corpus.jsonl 2 รอบแบบ streaming:
+  1. คำนวณ MinHash signature ของแต่ละ chunk แล้วจับกลุ่มด้วย LSH ภายใน product_id เดียวกัน
+  2. เขียน corpus ใหม่ โดย chunk ตัวแรกของกลุ่มได้ "source_files"/"duplicates" ของทุกตัวในกลุ่ม
+     และตัวที่เหลือถูกทำเครื่องหมาย "duplicate_of" (index.py จะข้าม chunk เหล่านี้)
+
+chunk ที่ซ้ำยังอยู่ใน corpus เพื่อให้ ingest แบบ incremental ใช้ต่อได้
+ถ้าไม่เจอ chunk ซ้ำและ corpus ไม่มีเครื่องหมายจากรอบก่อน จะไม่เขียน corpus ใหม่ (เหลือแค่รอบอ่าน)
+
+ข้อมูลใน data/ ตอนนี้ไม่มี chunk ที่ซ้ำกันเลย: MinHash similarity สูงสุดภายในสินค้าเดียวกันคือ 0.45
+(threshold 0.85) --dedup จึงปิดไว้เป็นค่าเริ่มต้น มีไว้สำหรับ catalog ที่ FAQ/complaint ถูก copy ต่อ ๆ กัน
+"""
+import os, re, json, zlib, random
+
+NUM_PERM = 64
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+THRESHOLD = 0.85
+# shade/ราคาแต่ละตัวของสินค้าต่างกันแค่ไม่กี่ตัวอักษร จึงไม่ตัดซ้ำ
+DEDUP_SOURCE_TYPES = ("faq", "complaint")
+DEDUP_FIELDS = ("duplicate_of", "duplicates", "source_files")
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_LABELS = re.compile(r"\b(?:Q|A|Complaint|Detail):")
+
+def shingles(text):
+    text = _LABELS.sub(" ", text.lower())
+    text = re.sub(r"[\W_]+", "", text)
+    if len(text) <= SHINGLE_SIZE:
+        return {zlib.crc32(text.encode("utf-8"))}
+    return {zlib.crc32(text[i:i + SHINGLE_SIZE].encode("utf-8")) for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+def minhash(text):
+    hs = shingles(text)
+    return tuple(min((a * h + b) % _PRIME for h in hs) for a, b in _PERMS)
+
+def similarity(sig_a, sig_b):
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERM
+
+def find_duplicates(chunks, threshold=THRESHOLD):
+    """คืน {chunk_id ที่ซ้ำ: chunk_id ตัวแทนของกลุ่ม} ตัวแทนคือ chunk แรกของกลุ่มตามลำดับ corpus"""
+    buckets = {}
+    signatures = {}
+    parent = {}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for order, chunk in enumerate(chunks):
+        if chunk.get("source_type") not in DEDUP_SOURCE_TYPES:
+            continue
+        cid = chunk["chunk_id"]
+        sig = minhash(chunk["text"])
+        signatures[cid] = (order, sig)
+        parent[cid] = cid
+        for band in range(BANDS):
+            key = (chunk.get("product_id"), band, sig[band * ROWS:(band + 1) * ROWS])
+            for other in buckets.get(key, ()):
+                if similarity(sig, signatures[other][1]) >= threshold:
+                    ra, rb = find(cid), find(other)
+                    if ra != rb:
+                        # ให้ตัวที่มาก่อนใน corpus เป็นตัวแทน
+                        if signatures[ra][0] < signatures[rb][0]:
+                            parent[rb] = ra
+                        else:
+                            parent[ra] = rb
+            buckets.setdefault(key, []).append(cid)
+
+    return {cid: find(cid) for cid in parent if find(cid) != cid}
+
+def iter_lines(corpus_file, counts=None):
+    """chunk ของ corpus โดยตัดเครื่องหมายของ dedup รอบก่อนออก (counts นับจำนวน chunk และ chunk ที่เคยมีเครื่องหมาย)"""
+    with open(corpus_file, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                chunk = json.loads(line)
+                popped = [chunk.pop(key, None) for key in DEDUP_FIELDS]
+                if counts is not None:
+                    counts["chunks"] += 1
+                    counts["marked"] += any(p is not None for p in popped)
+                yield chunk
+
+def dedup_corpus(corpus_file, threshold=THRESHOLD, embedding_dim=None):
+    if embedding_dim is None:
+        # ขนาดเวกเตอร์ตาม EMBEDDING_PROVIDER/EMBEDDING_DIMENSIONS ที่ index.py จะใช้
+        from embeddings import embedding_dimensions
+        embedding_dim = embedding_dimensions()
+    counts = {"chunks": 0, "marked": 0}
+    duplicate_of = find_duplicates(iter_lines(corpus_file, counts), threshold)
+    if not duplicate_of and not counts["marked"]:
+        print(f"[INFO] Dedup: 0/{counts['chunks']} chunks are near-duplicates; corpus left as is")
+        return {"chunks": counts["chunks"], "duplicates": 0, "groups": 0, "embeddings_saved": 0, "index_bytes_saved": 0}
+
+    groups = {}
+    for chunk in iter_lines(corpus_file):
+        rep = duplicate_of.get(chunk["chunk_id"])
+        if rep:
+            groups.setdefault(rep, []).append((chunk["chunk_id"], chunk["source_file"]))
+
+    total, saved_text_bytes = 0, 0
+    tmp = corpus_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as out:
+        for chunk in iter_lines(corpus_file):
+            total += 1
+            cid = chunk["chunk_id"]
+            if cid in duplicate_of:
+                chunk["duplicate_of"] = duplicate_of[cid]
+                saved_text_bytes += len(chunk["text"].encode("utf-8"))
+            elif cid in groups:
+                members = groups[cid]
+                chunk["duplicates"] = [m for m, _ in members]
+                chunk["source_files"] = sorted({chunk["source_file"], *(fn for _, fn in members)})
+            out.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+    os.replace(tmp, corpus_file)
+
+    saved = len(duplicate_of)
+    report = {
+        "chunks": total,
+        "duplicates": saved,
+        "groups": len(groups),
+        "embeddings_saved": saved,
+        # เวกเตอร์ float32 + ข้อความที่ไม่ต้องเก็บใน index
+        "index_bytes_saved": saved * embedding_dim * 4 + saved_text_bytes,
+    }
+    print(f"[INFO] Dedup: {saved}/{total} chunks are near-duplicates in {len(groups)} groups; "
+          f"saves {saved} embeddings and ~{report['index_bytes_saved'] / 1024:.1f} KiB of index")
+    return report
@@ -0,0 +1,244 @@
+"""
+Embedding layer ที่ batch คำขอและเก็บเวกเตอร์ไว้บนดิสก์ + provider ที่เลือกได้จาก config.py
+
+CachedEmbeddings ห่อ embeddings ของ LangChain (เช่น OpenAIEmbeddings) และมี method
+embed_documents/embed_query เหมือนกัน จึงส่งให้ Chroma ใช้แทนได้เลย
+cache เป็น SQLite key คือ sha256 ของ (model, dimensions, ข้อความที่ normalize แล้ว)
+reindex corpus เดิมจึงไม่ต้องเรียก API เลย และแก้ไฟล์เดียวก็ embed แค่ chunk ของไฟล์นั้น
+
+QueryEmbeddingCache เป็น LRU ใน memory อีกชั้นสำหรับ embed_query ของฝั่งตอบคำถาม
+คำถามยอดนิยมจึงไม่ต้องแตะ SQLite หรือ API เลย
+"""
+import os, math, zlib, hashlib, sqlite3, threading, unicodedata
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_FILE = os.path.join(BASE_DIR, ".cache", "embeddings.sqlite")
+BATCH_SIZE = 64
+MAX_CONCURRENCY = 4
+EMBEDDING_PROVIDERS = ("openai", "hashing")
+HASHING_DIMENSIONS = 512
+QUERY_CACHE_SIZE = 4096
+# ขนาดเต็มของ model ของ OpenAI (EMBEDDING_DIMENSIONS ว่าง)
+MODEL_DIMENSIONS = {"text-embedding-3-small": 1536, "text-embedding-3-large": 3072, "text-embedding-ada-002": 1536}
+
+def normalize_text(text):
+    return unicodedata.normalize("NFC", " ".join(text.split()))
+
+def cache_key(model, dimensions, text):
+    raw = f"{model}\x00{dimensions or ''}\x00{normalize_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def unit_vectors(vectors):
+    """เวกเตอร์ (หรือเมทริกซ์ทีละแถว) float32 ที่ยาว 1 (dot product = cosine similarity)"""
+    import numpy as np
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+class EmbeddingCache:
+    """เก็บเวกเตอร์ float32 ใน SQLite (ใช้ได้หลาย thread ผ่าน lock)"""
+
+    def __init__(self, path=CACHE_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, vec BLOB NOT NULL)")
+        self._conn.commit()
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vec FROM vectors WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                for key, blob in rows:
+                    vec = array("f")
+                    vec.frombytes(blob)
+                    found[key] = vec.tolist()
+        return found
+
+    def put_many(self, items):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vectors (key, vec) VALUES (?, ?)",
+                [(key, array("f", vec).tobytes()) for key, vec in items],
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+class CachedEmbeddings:
+    """Embeddings ที่ batch คำขอ (ขนาด/จำนวนพร้อมกันกำหนดได้) และ cache ผลลัพธ์ไว้บนดิสก์"""
+
+    def __init__(self, base, model, dimensions=None, cache=None, batch_size=BATCH_SIZE, max_concurrency=MAX_CONCURRENCY):
+        self.base = base
+        self.model = model
+        self.dimensions = dimensions
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.stats = {"hits": 0, "misses": 0, "api_calls": 0}
+
+    def _key(self, text):
+        return cache_key(self.model, self.dimensions, text)
+
+    def embed_documents(self, texts):
+        keys = [self._key(t) for t in texts]
+        vectors = self.cache.get_many(set(keys))
+
+        # ข้อความเดียวกันใน batch embed ครั้งเดียว
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = normalize_text(text)
+        self.stats["hits"] += len(keys) - sum(1 for k in keys if k in missing)
+        self.stats["misses"] += len(missing)
+
+        if missing:
+            items = list(missing.items())
+            batches = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+
+            def run(batch):
+                return list(zip((k for k, _ in batch), self.base.embed_documents([t for _, t in batch])))
+
+            workers = min(self.max_concurrency, len(batches))
+            if workers > 1:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(run, batches))
+            else:
+                results = [run(b) for b in batches]
+            self.stats["api_calls"] += len(batches)
+
+            for pairs in results:
+                self.cache.put_many(pairs)
+                vectors.update(pairs)
+
+        return [list(vectors[k]) for k in keys]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+class QueryEmbeddingCache:
+    """
+    LRU ของเวกเตอร์คำถามใน memory (ใช้ร่วมกันทั้ง process) ห่อ embeddings ตัวใดก็ได้
+    key เดียวกับ cache บนดิสก์: (model, dimensions, ข้อความที่ normalize แล้ว); embed_documents ส่งต่อตรง ๆ
+    """
+
+    def __init__(self, base, model=None, dimensions=None, max_entries=QUERY_CACHE_SIZE):
+        self.base = base
+        self.model = model or getattr(base, "model", type(base).__name__)
+        self.dimensions = dimensions if dimensions is not None else getattr(base, "dimensions", None)
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._vectors = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+
+    def embed_documents(self, texts):
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text):
+        key = cache_key(self.model, self.dimensions, text)
+        with self._lock:
+            vec = self._vectors.get(key)
+            if vec is not None:
+                self._vectors.move_to_end(key)
+                self.stats["hits"] += 1
+                return list(vec)
+            self.stats["misses"] += 1
+
+        vec = tuple(self.base.embed_query(text))
+        with self._lock:
+            self._vectors[key] = vec
+            while len(self._vectors) > self.max_entries:
+                self._vectors.popitem(last=False)
+                self.stats["evicted"] += 1
+        return list(vec)
+
+    def hit_rate(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._vectors)
+
+class HashingEmbeddings:
+    """
+    Embedding บน CPU ไม่ต้องใช้ network: นับ character n-gram (1–3 ตัวอักษร ใช้ได้กับภาษาไทยที่ไม่มีช่องว่าง)
+    hash ลงเวกเตอร์ขนาดคงที่ แล้ว normalize ให้ยาว 1 (cosine similarity = dot product)
+    """
+
+    def __init__(self, dimensions=HASHING_DIMENSIONS, ngram_range=(1, 3)):
+        self.dimensions = dimensions
+        self.ngram_range = ngram_range
+
+    def _embed(self, text):
+        text = normalize_text(text).lower()
+        vec = [0.0] * self.dimensions
+        lo, hi = self.ngram_range
+        for n in range(lo, hi + 1):
+            for i in range(len(text) - n + 1):
+                h = zlib.crc32(text[i:i + n].encode("utf-8"))
+                # bit สูงสุดเป็นเครื่องหมาย ลดผลของ hash ชนกัน
+                vec[h % self.dimensions] += 1.0 if h & 0x80000000 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec))
+        return [v / norm for v in vec] if norm else vec
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+def get_embeddings(provider=None, model=None, batch_size=BATCH_SIZE, max_concurrency=MAX_CONCURRENCY, dimensions=None):
+    """
+    สร้าง embeddings ตาม EMBEDDING_PROVIDER/EMBEDDING_DIMENSIONS ใน config.py (หรือที่ส่งเข้ามา)
+    dimensions=0 คือขนาดเต็มของ model
+    """
+    if provider is None or model is None or dimensions is None:
+        from config import EMBEDDING_PROVIDER, EMBEDDING_MODEL, EMBEDDING_DIMENSIONS
+        provider = provider or EMBEDDING_PROVIDER
+        model = model or EMBEDDING_MODEL
+        dimensions = EMBEDDING_DIMENSIONS if dimensions is None else dimensions
+    dimensions = dimensions or None
+
+    if provider == "hashing":
+        # คำนวณเร็วกว่าอ่าน cache อยู่แล้ว
+        return HashingEmbeddings(dimensions or HASHING_DIMENSIONS)
+    if provider == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        # text-embedding-3-* ตัดเวกเตอร์ให้สั้นลงได้ที่ฝั่ง API; cache แยกตาม dimensions อยู่แล้ว
+        base = OpenAIEmbeddings(model=model, dimensions=dimensions, openai_api_key=os.getenv("OPENAI_API_KEY"))
+        return CachedEmbeddings(base, model=model, dimensions=dimensions, batch_size=batch_size,
+                                max_concurrency=max_concurrency)
+    raise ValueError(f"unknown embedding provider: {provider} (expected one of {EMBEDDING_PROVIDERS})")
+
+def embedding_dimensions(provider=None, model=None, dimensions=None):
+    """จำนวนมิติของเวกเตอร์ที่ get_embeddings() ได้ด้วยค่าเดียวกัน (ไม่ต้องเรียก API)"""
+    if provider is None or model is None or dimensions is None:
+        from config import EMBEDDING_PROVIDER, EMBEDDING_MODEL, EMBEDDING_DIMENSIONS
+        provider = provider or EMBEDDING_PROVIDER
+        model = model or EMBEDDING_MODEL
+        dimensions = EMBEDDING_DIMENSIONS if dimensions is None else dimensions
+    if dimensions:
+        return dimensions
+    return HASHING_DIMENSIONS if provider == "hashing" else MODEL_DIMENSIONS.get(model, 1536)
+
+def collection_name(provider=None, base="kage_products", dimensions=None):
+    """
+    แต่ละ provider/จำนวนมิติได้เวกเตอร์คนละขนาด จึงแยก collection กัน
+    (openai ขนาดเต็มใช้ชื่อเดิม, เช่น kage_products_hashing, kage_products_256d)
+    """
+    if provider is None or dimensions is None:
+        from config import EMBEDDING_PROVIDER, EMBEDDING_DIMENSIONS
+        provider = provider or EMBEDDING_PROVIDER
+        dimensions = EMBEDDING_DIMENSIONS if dimensions is None else dimensions
+    name = base if provider == "openai" else f"{base}_{provider}"
+    return f"{name}_{dimensions}d" if dimensions else name
@@ -0,0 +1,172 @@
+"""
+ตอบคำถามที่ตรงกับ FAQ ด้วยคำตอบ (solution) ที่เก็บไว้เลย ไม่ต้อง retrieval และไม่เรียก LLM
+
+index.py สร้าง faq_index.json (คู่ question -> solution ของ chunk ประเภท faq ใน corpus) ใน generation
+เดียวกับ index อื่น ตอนตอบ FAQMatcher ให้คะแนนความมั่นใจ 0–1 ของ FAQ ที่ใกล้ที่สุดของสินค้านั้น
+
+    lexical    Dice ของ character bigram ของคำถามที่ normalize แล้ว (แบบเดียวกับ answer_cache)
+    semantic   cosine similarity ของ embedding คำถาม
+    confidence ค่า lexical ถ้าไม่มี embedding ไม่อย่างนั้นค่าเฉลี่ยถ่วงน้ำหนัก LEXICAL_WEIGHT
+
+ตอบตรงเมื่อ confidence >= FAQ_MATCH_THRESHOLD (config.py) ค่ายิ่งต่ำยิ่งมีคำถามที่ได้คำตอบเร็วมากขึ้น
+semantic มากสุดได้ 1 คำถามที่ lexical ต่ำกว่า lexical_floor(threshold) (0.7 ที่ค่า default) จึงไม่มีทางถึง
+threshold และ match() ไม่ embed คำถามนั้นเลย
+
+    python faq_index.py "มาสคาร่าเป็นก้อนทำไงดี" --product M001
+"""
+import os, re, json, threading, argparse
+
+import numpy as np
+
+import generations
+from answer_cache import normalize_question
+from embeddings import unit_vectors
+
+FAQ_FILE = "faq_index.json"
+LEXICAL_WEIGHT = 0.5
+
+_QA = re.compile(r"^Q:\s*(.+?)\s+A:\s*(.+)$", re.S)
+
+stats = {"matched": 0, "missed": 0}
+
+def build_entries(items):
+    """คู่คำถาม/คำตอบจาก chunk ประเภท faq (FAQ ที่ถูกตัดเป็นหลาย chunk ไม่นับ เพราะคำตอบไม่ครบใน chunk เดียว)"""
+    entries, last = [], None
+    for it in items:
+        if it.get("source_type") != "faq" or it.get("duplicate_of"):
+            last = None
+            continue
+        m = _QA.match(it["text"])
+        if not m:
+            # chunk ต่อจาก FAQ ก่อนหน้า
+            if last is not None and entries and entries[-1] is last:
+                entries.pop()
+            last = None
+            continue
+        last = {"question": m.group(1).strip(), "answer": m.group(2).strip(), "product_id": it.get("product_id"),
+                "source_file": it.get("source_file"), "chunk_id": it.get("chunk_id")}
+        entries.append(last)
+    return entries
+
+def build(items, path=FAQ_FILE, embedding=None):
+    """เขียน faq_index.json; ส่ง embedding มาเพื่อ embed คำถามไว้ใน cache ล่วงหน้า"""
+    entries = build_entries(items)
+    if embedding is not None and entries:
+        embedding.embed_documents([e["question"] for e in entries])
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"entries": entries}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    print(f"[INFO] Built FAQ index with {len(entries)} questions in {path}")
+    return len(entries)
+
+def bigrams(text):
+    text = text.replace(" ", "")
+    return {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+
+def dice(a, b):
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+def lexical_floor(threshold, weight=LEXICAL_WEIGHT):
+    """lexical ต่ำสุดที่ยังถึง threshold ได้ถ้า semantic = 1"""
+    return (threshold - (1 - weight)) / weight if weight else 0.0
+
+class FAQMatcher:
+    def __init__(self, entries, embedding=None):
+        self.entries = entries
+        self.embedding = embedding
+        self._grams = [bigrams(normalize_question(e["question"])) for e in entries]
+        self._by_product = {}
+        for i, e in enumerate(entries):
+            self._by_product.setdefault(e.get("product_id") or "", []).append(i)
+        self._vectors = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=FAQ_FILE, embedding=None):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f)["entries"], embedding)
+
+    def vectors(self):
+        if self._vectors is None:
+            with self._lock:
+                if self._vectors is None:
+                    self._vectors = unit_vectors(self.embedding.embed_documents([e["question"] for e in self.entries]))
+        return self._vectors
+
+    def best(self, question, product_id, threshold=None):
+        """
+        (entry, confidence) ของ FAQ ที่ใกล้ที่สุดของสินค้านี้ หรือ (None, 0.0)
+        ถ้าส่ง threshold มาและ lexical ต่ำเกินกว่าจะถึง จะไม่ embed คำถาม (confidence คือค่าสูงสุดที่เป็นไปได้)
+        """
+        candidates = self._by_product.get(product_id or "", [])
+        normalized = normalize_question(question)
+        if not candidates or not normalized:
+            return None, 0.0
+        grams = bigrams(normalized)
+        lexical = np.array([dice(grams, self._grams[i]) for i in candidates])
+        confidence = lexical
+        if self.embedding is not None and threshold is not None and lexical.max() < lexical_floor(threshold):
+            confidence = LEXICAL_WEIGHT * lexical + (1 - LEXICAL_WEIGHT)
+        elif self.embedding is not None:
+            semantic = self.vectors()[candidates] @ unit_vectors(self.embedding.embed_query(question))
+            confidence = LEXICAL_WEIGHT * lexical + (1 - LEXICAL_WEIGHT) * semantic
+        i = int(np.argmax(confidence))
+        return self.entries[candidates[i]], float(confidence[i])
+
+    def match(self, question, product_id, threshold):
+        """{"answer", "sources", "confidence"} ถ้ามั่นใจพอ ไม่อย่างนั้น None"""
+        entry, confidence = self.best(question, product_id, threshold)
+        if entry is None or confidence < threshold:
+            stats["missed"] += 1
+            return None
+        stats["matched"] += 1
+        return {"answer": entry["answer"], "confidence": confidence,
+                "sources": [{"source_file": entry["source_file"], "chunk_id": entry["chunk_id"]}]}
+
+_loaded = {}
+_load_lock = threading.Lock()
+
+def get_faq_matcher(embedding=None, path=None):
+    """FAQMatcher ของ generation ปัจจุบัน (หรือ path ที่ส่งมา) โหลดใหม่เมื่อไฟล์เปลี่ยน; None ถ้ายังไม่มี"""
+    resolved = path or generations.current_path(FAQ_FILE)
+    if resolved is None:
+        return None
+    try:
+        version = (os.path.abspath(resolved), os.stat(resolved).st_mtime_ns)
+    except FileNotFoundError:
+        return None
+    key = (path, id(embedding))
+    with _load_lock:
+        cached = _loaded.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+        matcher = FAQMatcher.load(resolved, embedding)
+        _loaded[key] = (version, matcher)
+        return matcher
+
+def fast_path_rate():
+    total = stats["matched"] + stats["missed"]
+    return stats["matched"] / total if total else 0.0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the closest FAQ and its confidence for a question")
+    parser.add_argument("question")
+    parser.add_argument("--product", required=True, help="product_id, e.g. M001")
+    parser.add_argument("--path", help=f"faq index (default: {FAQ_FILE} of the current generation)")
+    parser.add_argument("--lexical-only", action="store_true", help="skip the embedding similarity")
+    args = parser.parse_args()
+
+    embedding = None
+    if not args.lexical_only:
+        from embeddings import get_embeddings
+        embedding = get_embeddings()
+    matcher = get_faq_matcher(embedding, args.path)
+    if matcher is None:
+        raise SystemExit(f"[WARN] No {FAQ_FILE} yet; run python index.py")
+    entry, confidence = matcher.best(args.question, args.product)
+    from config import FAQ_MATCH_THRESHOLD
+    print(f"confidence {confidence:.3f} (threshold {FAQ_MATCH_THRESHOLD}) -> "
+          + ("direct answer" if confidence >= FAQ_MATCH_THRESHOLD else "LLM"))
+    if entry:
+        print(f"Q: {entry['question']}\nA: {entry['answer']}\n({entry['source_file']})")
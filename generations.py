@@ -0,0 +1,242 @@
+"""
+Index แบบมี generation: index.py ไม่เขียนทับ index ที่หน้าเว็บใช้อยู่เลย
+
+ทุกการ build/sync สร้างโฟลเดอร์ generation ใหม่ (เริ่มจากสำเนาของทุก component ของ generation
+ปัจจุบัน) เขียนให้เสร็จแล้วจึงสลับไฟล์ pointer indexes/CURRENT ด้วย os.replace ซึ่ง atomic reader จึงเห็นแค่ generation
+ที่สมบูรณ์แล้วเสมอ และ rollback คือการชี้ CURRENT กลับไป generation ก่อนหน้า (ยังเก็บไว้ KEEP_GENERATIONS ชุด)
+
+component ที่ build นั้นไม่ได้เขียนใหม่ (เช่น vector_index ตอน sync Chroma) ยังถูกพามา reader ที่ใช้ backend
+อีกตัวจึงไม่เจอ generation ที่ไม่มี index ของตัวเอง แต่ข้อมูลอาจเก่ากว่า corpus ใน manifest ของ component
+นั้นจึงมี "carried_from" (generation ที่สร้างมันจริง) จนกว่าจะ build backend นั้นใหม่
+
+ไฟล์ที่พามาเป็น hard link (ไม่กินที่/เวลาเพิ่ม) ยกเว้นไฟล์ที่ build จะแก้ในที่ (ส่ง copy= มา) ซึ่งต้อง copy
+จริงไม่อย่างนั้น generation เดิมจะถูกแก้ไปด้วย: sync ของ Chroma ต้อง copy chroma.sqlite3 และ HNSW segment
+ของ collection ที่เขียน (live_index.chroma_write_paths) เวลา sync จึงยังโตตามขนาดของ collection นั้น
+(collection อื่นใน chroma_db เป็น link) จำนวน byte ที่ copy/link และเวลาอยู่ใน "carried" ของ manifest
+
+    indexes/
+        CURRENT                 ชื่อ generation ที่ใช้งานอยู่ เช่น gen-000007
+        gen-000007/
+            manifest.json       generation, parent, เวลา, hash ของ corpus และ component ที่มี
+            chroma_db/          (VECTOR_BACKEND=chroma)
+            vector_index/       (VECTOR_BACKEND=numpy)
+            lexical_index.json
+            faq_index.json
+
+    python generations.py list
+    python generations.py rollback [--to 6]
+    python generations.py prune --keep 3
+"""
+import os, re, json, time, shutil, hashlib, argparse
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+INDEX_ROOT = "indexes"
+POINTER_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+KEEP_GENERATIONS = 3
+# ชื่อ component ใน manifest -> path ใน generation
+COMPONENT_PATHS = {"chroma": "chroma_db", "numpy": "vector_index",
+                   "lexical": "lexical_index.json", "faq": "faq_index.json"}
+
+_GEN_DIR = re.compile(r"gen-(\d+)(\.staging)?$")
+
+def gen_name(generation):
+    return f"gen-{generation:06d}"
+
+def gen_dir(generation, root=INDEX_ROOT):
+    return os.path.join(root, gen_name(generation))
+
+def list_generations(root=INDEX_ROOT, staging=False):
+    found = []
+    if os.path.isdir(root):
+        for name in os.listdir(root):
+            m = _GEN_DIR.match(name)
+            if m and (staging or not m.group(2)):
+                found.append(int(m.group(1)))
+    return sorted(found)
+
+def current_generation(root=INDEX_ROOT):
+    """generation ที่ CURRENT ชี้อยู่ (0 ถ้ายังไม่เคย build)"""
+    try:
+        with open(os.path.join(root, POINTER_FILE), "r", encoding="utf-8") as f:
+            m = _GEN_DIR.match(f.read().strip())
+    except FileNotFoundError:
+        return 0
+    return int(m.group(1)) if m else 0
+
+def current_path(name, root=INDEX_ROOT):
+    """path ของ component (เช่น chroma_db) ใน generation ปัจจุบัน หรือ None ถ้ายังไม่มี index"""
+    generation = current_generation(root)
+    return os.path.join(gen_dir(generation, root), name) if generation else None
+
+def read_manifest(generation, root=INDEX_ROOT):
+    try:
+        with open(os.path.join(gen_dir(generation, root), MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def activate(generation, root=INDEX_ROOT):
+    """ชี้ CURRENT ไปที่ generation นี้ (atomic)"""
+    if not os.path.isdir(gen_dir(generation, root)):
+        raise FileNotFoundError(f"generation {generation} does not exist in {root}")
+    tmp = os.path.join(root, f"{POINTER_FILE}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(gen_name(generation))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(root, POINTER_FILE))
+    return generation
+
+def rollback(to=None, root=INDEX_ROOT):
+    current = current_generation(root)
+    if to is None:
+        older = [g for g in list_generations(root) if g < current]
+        if not older:
+            raise RuntimeError(f"no generation older than {current} to roll back to")
+        to = older[-1]
+    return activate(to, root)
+
+def prune(keep=KEEP_GENERATIONS, root=INDEX_ROOT):
+    """ลบ generation เก่า เก็บ keep ชุดล่าสุดและชุดที่ CURRENT ชี้อยู่ไว้เสมอ"""
+    current = current_generation(root)
+    generations = list_generations(root)
+    removed = [g for g in generations[:max(0, len(generations) - keep)] if g != current]
+    for g in removed:
+        shutil.rmtree(gen_dir(g, root), ignore_errors=True)
+    return removed
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+        return False
+    except OSError:
+        shutil.copy2(src, dst)
+        return True
+
+def copy_generation(src, dst, names=None, copy=()):
+    """
+    พา component (ทั้งหมดถ้า names เป็น None) จาก generation src มาไว้ใน dst เป็น hard link
+    ยกเว้น path (relative กับ generation) ใน copy และทุกอย่างใต้ path นั้นที่ copy จริง
+    คืน {"copied_bytes", "linked_bytes"}
+    """
+    copy = tuple(os.path.normpath(p) for p in copy)
+    totals = {"copied_bytes": 0, "linked_bytes": 0}
+
+    def transfer(s, d):
+        rel = os.path.relpath(s, src)
+        if any(rel == p or rel.startswith(p + os.sep) for p in copy):
+            shutil.copy2(s, d)
+            copied = True
+        else:
+            copied = _link_or_copy(s, d)
+        totals["copied_bytes" if copied else "linked_bytes"] += os.path.getsize(s)
+        return d
+
+    for name in COMPONENT_PATHS.values() if names is None else names:
+        s, d = os.path.join(src, name), os.path.join(dst, name)
+        if os.path.isdir(s):
+            shutil.copytree(s, d, copy_function=transfer)
+        elif os.path.exists(s):
+            transfer(s, d)
+    return totals
+
+class Staging:
+    """generation ที่กำลังเขียน; component เขียนลง path(name) และใส่ข้อมูลลง components"""
+
+    def __init__(self, path, generation, parent, components):
+        self.dir = path
+        self.generation = generation
+        self.parent = parent
+        self.components = components
+        self.discarded = False
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def discard(self):
+        """ไม่ publish generation นี้ (เช่น sync แล้วไม่มีอะไรเปลี่ยน)"""
+        self.discarded = True
+
+@contextmanager
+def stage(corpus_file=None, root=INDEX_ROOT, keep=KEEP_GENERATIONS, copy=()):
+    """
+    เตรียม generation ใหม่ แล้ว publish (สลับ CURRENT) เมื่อออกจาก with
+    ทุก component ของ generation ปัจจุบันถูกพามาพร้อมข้อมูลใน manifest (มี carried_from) build เขียน
+    component ที่สร้างใหม่ลง staging.components แทน
+    copy: path ใน generation ที่ build จะแก้ในที่ (copy จริง ส่วนที่เหลือเป็น hard link)
+    ถ้าเกิด exception หรือเรียก discard() จะลบทิ้งโดยที่ CURRENT ไม่เปลี่ยน
+    """
+    os.makedirs(root, exist_ok=True)
+    parent = current_generation(root)
+    generation = max(list_generations(root, staging=True) + [parent]) + 1
+    path = os.path.join(root, gen_name(generation) + ".staging")
+    try:
+        os.mkdir(path)
+    except FileExistsError:
+        raise RuntimeError(f"another index build is already writing {path}") from None
+
+    try:
+        carried = {"copied_bytes": 0, "linked_bytes": 0, "seconds": 0.0}
+        if parent:
+            start = time.perf_counter()
+            carried.update(copy_generation(gen_dir(parent, root), path, copy=copy))
+            carried["seconds"] = round(time.perf_counter() - start, 3)
+            print(f"[INFO] Carried {gen_name(parent)} into {gen_name(generation)}: "
+                  f"{carried['copied_bytes'] / 1e6:.1f} MB copied, {carried['linked_bytes'] / 1e6:.1f} MB hard-linked "
+                  f"in {carried['seconds']:.2f}s")
+        components = {c: dict(info, carried_from=info.get("carried_from", parent))
+                      for c, info in read_manifest(parent, root).get("components", {}).items()}
+        staging = Staging(path, generation, parent, components)
+        yield staging
+    except BaseException:
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+    if staging.discarded:
+        shutil.rmtree(path, ignore_errors=True)
+        return
+
+    manifest = {
+        "generation": generation,
+        "parent": parent or None,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "corpus_sha256": file_sha256(corpus_file) if corpus_file and os.path.exists(corpus_file) else None,
+        "components": staging.components,
+        "carried": carried,
+    }
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(path, gen_dir(generation, root))
+    activate(generation, root)
+    prune(keep, root)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List, roll back or prune index generations")
+    parser.add_argument("--root", default=INDEX_ROOT)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list")
+    p_rollback = sub.add_parser("rollback")
+    p_rollback.add_argument("--to", type=int, help="generation to activate (default: the previous one)")
+    p_prune = sub.add_parser("prune")
+    p_prune.add_argument("--keep", type=int, default=KEEP_GENERATIONS)
+    args = parser.parse_args()
+
+    if args.cmd == "list":
+        current = current_generation(args.root)
+        for g in list_generations(args.root):
+            m = read_manifest(g, args.root)
+            mark = "*" if g == current else " "
+            print(f"{mark} {gen_name(g)}  {m.get('created_at', '?')}  {', '.join(sorted(m.get('components', {})))}")
+    elif args.cmd == "rollback":
+        print(f"[INFO] CURRENT -> {gen_name(rollback(args.to, args.root))}")
+    else:
+        removed = prune(args.keep, args.root)
+        print(f"[INFO] Removed {len(removed)} generations" + (f": {removed}" if removed else ""))
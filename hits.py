@@ -0,0 +1,18 @@
+"""ผลการค้นที่ vector_store, lexical_index และ context_packer ใช้ร่วมกัน (ไม่ต้อง import numpy/faiss)"""
+
+class Hit:
+    """
+    ผลการค้น มี page_content/metadata แบบเดียวกับ Document ของ LangChain
+    vector: เวกเตอร์ (normalize แล้ว) ของ chunk ถ้า store มีให้ context_packer จึงไม่ต้อง embed chunk ซ้ำ
+    """
+
+    __slots__ = ("page_content", "metadata", "score", "vector")
+
+    def __init__(self, page_content, metadata, score, vector=None):
+        self.page_content = page_content
+        self.metadata = metadata
+        self.score = score
+        self.vector = vector
+
+    def __repr__(self):
+        return f"Hit(score={self.score:.4f}, chunk_id={self.metadata.get('chunk_id')!r})"
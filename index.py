@@ -1,43 +1,200 @@
-import os, json
+import os, json, hashlib, argparse
 from dotenv import load_dotenv
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.vectorstores import Chroma
-from langchain.docstore.document import Document
+from corpus_store import iter_corpus
+from live_index import PERSIST_DIR, COLLECTION_NAME, clear_chroma_cache, chroma_write_paths
+import generations
+import embeddings
+import lexical_index
+import faq_index
+from embeddings import BATCH_SIZE, MAX_CONCURRENCY
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 CORPUS_FILE = "corpus.jsonl"
-PERSIST_DIR = "chroma_db"
-
-def main():
-    emb = OpenAIEmbeddings(model="text-embedding-3-small", openai_api_key=OPENAI_API_KEY)
-    
-    # load corpus
-    docs = []
-    with open(CORPUS_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            item = json.loads(line)
-            doc = Document(
-                page_content=item["text"],
-                metadata={
-                    "chunk_id": item["chunk_id"],
-                    "product_id": item["product_id"],
-                    "source_file": item["source_file"],
-                    "source_type": item["source_type"]
-                }
-            )
-            docs.append(doc)
-    
-    # create Chroma vector store
-    db = Chroma.from_documents(
-        docs,
-        embedding=emb,
-        persist_directory=PERSIST_DIR,
-        collection_name="kage_products"
-    )
-    db.persist()
-    print(f"[INFO] Indexed {len(docs)} chunks in {PERSIST_DIR}")
+
+def get_embeddings(batch_size=BATCH_SIZE, max_concurrency=MAX_CONCURRENCY, provider=None, dimensions=None):
+    # provider/dimensions มาจาก EMBEDDING_PROVIDER/EMBEDDING_DIMENSIONS ใน config.py
+    # openai ถูก cache ไว้ใน .cache/embeddings.sqlite
+    return embeddings.get_embeddings(provider, batch_size=batch_size, max_concurrency=max_concurrency,
+                                     dimensions=dimensions)
+
+def report_embeddings(emb):
+    stats = getattr(emb, "stats", None)
+    if not stats:
+        return
+    print(f"[INFO] Embeddings: {stats['hits']} cached, {stats['misses']} embedded in {stats['api_calls']} API calls")
+
+def to_document(item):
+    from langchain.docstore.document import Document
+
+    metadata = {
+        "chunk_id": item["chunk_id"],
+        "product_id": item["product_id"],
+        "source_file": item["source_file"],
+        "source_type": item["source_type"]
+    }
+    # chunk ของสินค้าแบบ structured บอกว่ามาจาก field/เฉดสีไหน
+    for key in ("field", "shade"):
+        if item.get(key):
+            metadata[key] = item[key]
+    # metadata ของ Chroma เก็บ list ไม่ได้
+    if item.get("source_files"):
+        metadata["source_files"] = ", ".join(item["source_files"])
+    # hash ของเนื้อหา+metadata ใช้ตัดสินว่า chunk ใน index ต้องอัปเดตหรือไม่
+    raw = json.dumps([item["text"], metadata], ensure_ascii=False, sort_keys=True)
+    metadata["content_hash"] = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    return Document(page_content=item["text"], metadata=metadata)
+
+def load_documents(corpus_file=CORPUS_FILE):
+    """อ่าน corpus (corpus.jsonl หรือ corpus.bin) เป็น Document"""
+    docs, skipped = [], 0
+    for item in iter_corpus(corpus_file):
+        # chunk ที่ซ้ำกับตัวอื่น (ingest.py --dedup) ไม่ต้อง embed ซ้ำ
+        if item.get("duplicate_of"):
+            skipped += 1
+            continue
+        docs.append(to_document(item))
+    return docs, skipped
+
+def diff_index(docs, existing):
+    """
+    เทียบ corpus กับสิ่งที่อยู่ใน collection (existing = {id: content_hash})
+    คืน (docs ที่ต้องเพิ่ม, docs ที่ต้องอัปเดต, ids ที่ต้องลบ)
+    """
+    wanted = {d.metadata["chunk_id"]: d for d in docs}
+    to_add = [d for cid, d in wanted.items() if cid not in existing]
+    to_update = [d for cid, d in wanted.items() if cid in existing and existing[cid] != d.metadata["content_hash"]]
+    # id ที่ไม่อยู่ใน corpus แล้ว รวมถึง id สุ่มจาก index รุ่นก่อน ๆ ที่ทำให้ chunk ซ้ำกัน
+    to_delete = sorted(cid for cid in existing if cid not in wanted)
+    return to_add, to_update, to_delete
+
+def existing_hashes(db):
+    data = db.get(include=["metadatas"])
+    return {cid: (meta or {}).get("content_hash") for cid, meta in zip(data["ids"], data["metadatas"])}
+
+def sync(corpus_file=CORPUS_FILE, batch_size=BATCH_SIZE, max_concurrency=MAX_CONCURRENCY, rebuild=False, provider=None,
+         dimensions=None):
+    """
+    ปรับ collection ให้ตรงกับ corpus โดยใช้ chunk_id เป็น key:
+    เพิ่ม chunk ใหม่, อัปเดต chunk ที่เนื้อหาเปลี่ยน, ลบ chunk ที่ไม่มีแล้ว
+    งาน (และการ embed) จึงเป็นสัดส่วนกับส่วนที่เปลี่ยน ไม่ใช่ขนาดของ corpus
+
+    แก้บนสำเนาของ generation ปัจจุบันแล้ว publish เป็น generation ใหม่ (ไม่มีอะไรเปลี่ยนก็ไม่ publish)
+    """
+    # import ตอนใช้ --backend numpy จึงไม่ต้องติดตั้ง LangChain/Chroma
+    from langchain.vectorstores import Chroma
+
+    emb = get_embeddings(batch_size, max_concurrency, provider, dimensions)
+    collection = embeddings.collection_name(provider, base=COLLECTION_NAME, dimensions=dimensions)
+    docs, skipped = load_documents(corpus_file)
+    # แก้ Chroma ต่อจาก generation เดิม (vector_index ของ backend numpy ถูกพามาด้วยโดยไม่แก้)
+    # copy จริงเฉพาะ SQLite และ HNSW segment ของ collection นี้ที่ Chroma จะแก้ ที่เหลือเป็น hard link
+    copy = chroma_write_paths(generations.current_path(PERSIST_DIR), collection)
+    with generations.stage(corpus_file, copy=copy) as gen:
+        persist_dir = gen.path(PERSIST_DIR)
+        db = Chroma(persist_directory=persist_dir, embedding_function=emb, collection_name=collection)
+        if rebuild:
+            db.delete_collection()
+            db = Chroma(persist_directory=persist_dir, embedding_function=emb, collection_name=collection)
+
+        to_add, to_update, to_delete = diff_index(docs, existing_hashes(db))
+        if to_delete:
+            db.delete(ids=to_delete)
+        if to_update:
+            db.update_documents([d.metadata["chunk_id"] for d in to_update], to_update)
+        if to_add:
+            db.add_documents(to_add, ids=[d.metadata["chunk_id"] for d in to_add])
+        db.persist()
+        # ปล่อย client ของ path ชั่วคราวก่อนย้ายโฟลเดอร์
+        del db
+        clear_chroma_cache()
+        report_embeddings(emb)
+
+        changed = bool(to_add or to_update or to_delete)
+        lexical_file = gen.path(lexical_index.LEXICAL_FILE)
+        faq_file = gen.path(faq_index.FAQ_FILE)
+        if changed or rebuild or not os.path.exists(lexical_file) or not os.path.exists(faq_file):
+            lexical_index.build(iter_corpus(corpus_file), lexical_file)
+            faqs = faq_index.build(iter_corpus(corpus_file), faq_file, embedding=emb)
+            gen.components["chroma"] = {"collection": collection, "chunks": len(docs)}
+            gen.components["lexical"] = {"chunks": len(docs)}
+            gen.components["faq"] = {"questions": faqs}
+        else:
+            gen.discard()
+    generation = None if gen.discarded else gen.generation
+    print(f"[INFO] Synced {len(docs)} chunks into {collection}: {len(to_add)} added, {len(to_update)} updated, "
+          f"{len(to_delete)} deleted ({skipped} near-duplicates skipped"
+          + (f", generation {generation})" if generation else ", index unchanged)"))
+    return {"added": len(to_add), "updated": len(to_update), "deleted": len(to_delete), "generation": generation}
+
+def read_vector_manifest(path):
+    manifest_file = os.path.join(path, "manifest.json")
+    if not os.path.exists(manifest_file):
+        return None
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def build_numpy(corpus_file=CORPUS_FILE, batch_size=BATCH_SIZE, max_concurrency=MAX_CONCURRENCY, provider=None,
+                quantization=None, dimensions=None, rebuild=False):
+    """
+    สร้าง vector_index/ สำหรับ VECTOR_BACKEND=numpy เป็น generation ใหม่
+    shard ของสินค้าที่ chunk ไม่เปลี่ยนถูกใช้ซ้ำจาก generation เดิม (hard link ไม่ embed ใหม่) เหมือน sync ของ Chroma
+    ไม่มีอะไรเปลี่ยนก็ไม่ publish; --rebuild สร้างทุก shard ใหม่
+    """
+    import vector_store
+    from config import EMBEDDING_PROVIDER, EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, VECTOR_QUANTIZATION
+
+    emb = get_embeddings(batch_size, max_concurrency, provider, dimensions)
+    info = {"provider": provider or EMBEDDING_PROVIDER, "model": EMBEDDING_MODEL,
+            "dimensions": EMBEDDING_DIMENSIONS if dimensions is None else dimensions}
+    quantization = quantization or VECTOR_QUANTIZATION
+    # chroma_db และ vector_index ของ generation เดิมถูกพามา (hard link) build ใช้ shard ที่ไม่เปลี่ยนซ้ำจากตรงนั้น
+    with generations.stage(corpus_file) as gen:
+        vector_dir = gen.path(vector_store.VECTOR_DIR)
+        before = read_vector_manifest(vector_dir)
+        n = vector_store.build(iter_corpus(corpus_file), emb, path=vector_dir,
+                               embedding_info=info, quantization=quantization, reuse=not rebuild)
+        lexical_file = gen.path(lexical_index.LEXICAL_FILE)
+        faq_file = gen.path(faq_index.FAQ_FILE)
+        # generation เดิมเป็น build ของ numpy เอง (lexical/faq มาจาก corpus ชุดเดียวกัน) และไม่มี shard ไหนเปลี่ยน
+        built_by_parent = gen.components.get("numpy", {}).get("carried_from") == gen.parent
+        if not rebuild and built_by_parent and before == read_vector_manifest(vector_dir) \
+                and os.path.exists(lexical_file) and os.path.exists(faq_file):
+            gen.discard()
+        else:
+            lexical_index.build(iter_corpus(corpus_file), lexical_file)
+            faqs = faq_index.build(iter_corpus(corpus_file), faq_file, embedding=emb)
+            gen.components["numpy"] = {"rows": n, "quantization": quantization, "embedding": info}
+            gen.components["lexical"] = {"chunks": n}
+            gen.components["faq"] = {"questions": faqs}
+    report_embeddings(emb)
+    print(f"[INFO] Published generation {gen.generation}" if not gen.discarded else "[INFO] Vector index unchanged")
+    return n
+
+def main(corpus_file=CORPUS_FILE, batch_size=BATCH_SIZE, max_concurrency=MAX_CONCURRENCY, rebuild=False, provider=None, backend=None,
+         quantization=None, dimensions=None):
+    if backend is None:
+        from config import VECTOR_BACKEND
+        backend = VECTOR_BACKEND
+    if backend == "numpy":
+        return build_numpy(corpus_file, batch_size, max_concurrency, provider, quantization, dimensions, rebuild)
+    return sync(corpus_file, batch_size, max_concurrency, rebuild, provider, dimensions)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Index the corpus into Chroma")
+    parser.add_argument("--corpus", default=CORPUS_FILE, help="corpus.jsonl or a corpus.bin store")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="texts per embedding request")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY, help="embedding requests in flight")
+    parser.add_argument("--provider", choices=embeddings.EMBEDDING_PROVIDERS,
+                        help="embedding provider (default: EMBEDDING_PROVIDER in config.py)")
+    parser.add_argument("--backend", choices=("chroma", "numpy"),
+                        help="vector store to build (default: VECTOR_BACKEND in config.py)")
+    parser.add_argument("--quantization", choices=("none", "int8", "pq"),
+                        help="numpy backend vector codes (default: VECTOR_QUANTIZATION in config.py)")
+    parser.add_argument("--dimensions", type=int,
+                        help="embedding length to reindex at, 0 = full size (default: EMBEDDING_DIMENSIONS in config.py)")
+    parser.add_argument("--rebuild", action="store_true", help="drop the collection (or every numpy shard) and index everything again")
+    args = parser.parse_args()
+    main(corpus_file=args.corpus, batch_size=args.batch_size, max_concurrency=args.concurrency, rebuild=args.rebuild,
+         provider=args.provider, backend=args.backend, quantization=args.quantization, dimensions=args.dimensions)
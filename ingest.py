@@ -1,9 +1,49 @@
-import os, glob, json, re
-from uuid import uuid4
+import os, glob, json, re, hashlib, argparse
+from functools import partial
+from multiprocessing import Pool
+
+from token_count import count_tokens, tokenizer_name
+import corpus_store
+import dedup
+from uuid import uuid5, NAMESPACE_URL
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "data")
 CORPUS_FILE = os.path.join(BASE_DIR, "corpus.jsonl")
+MANIFEST_FILE = os.path.join(BASE_DIR, "ingest_manifest.json")
+
+CHUNKERS = ("thai", "words")
+DEFAULT_CHUNKER = "thai"
+CHUNK_MAX_TOKENS = 200
+CHUNK_OVERLAP_TOKENS = 40
+
+PRODUCT_MODES = ("structured", "blob")
+DEFAULT_PRODUCT_MODE = "structured"
+
+# แต่ละ block ของ product_*.json ที่จะแยกเป็น chunk ของตัวเอง (field, keys)
+PRODUCT_BLOCKS = [
+    ("overview", ["type", "form", "texture", "finish", "coverage", "use_for", "color_range"]),
+    ("price", ["price", "volume", "shelf_life", "storage"]),
+    ("usage", ["usage"]),
+    ("key_features", ["key_features"]),
+    ("advantages", ["advantages"]),
+    ("disadvantages", ["disadvantages"]),
+    ("cautions", ["cautions"]),
+]
+FIELD_LABELS = {
+    "type": "ประเภท", "form": "รูปแบบ", "texture": "เนื้อสัมผัส", "finish": "ฟินิช",
+    "coverage": "การปกปิด", "use_for": "ใช้สำหรับ", "color_range": "จำนวนสี",
+    "price": "ราคา", "volume": "ปริมาณ", "shelf_life": "อายุการเก็บรักษา", "storage": "การเก็บรักษา",
+    "usage": "วิธีใช้", "key_features": "จุดเด่น", "advantages": "ข้อดี",
+    "disadvantages": "ข้อเสีย", "cautions": "ข้อควรระวัง",
+    "color_name": "สี", "description": "ลักษณะ", "personal_color": "Personal color",
+    "skin_tone": "โทนผิว", "hair_color_match": "สีผมที่เข้ากัน",
+    "suitable_skin_type": "สภาพผิว", "suitable_look": "ลุค",
+}
+PRODUCT_KEYS = {"product_id", "name_th", "name_en", "shades"}
+
+# namespace คงที่ เพื่อให้ chunk_id เดิมได้ค่าเดิมทุกครั้งที่ ingest
+CHUNK_NAMESPACE = uuid5(NAMESPACE_URL, "kage-sekai/corpus")
 
 '''
 update from:
@@ -32,50 +72,396 @@ def chunk_text(text, chunk_size=300, overlap=50):
         i += chunk_size - overlap
     return chunks
 
-def load_all_json(data_dir=DATA_DIR):
-    docs = []
-    for path in glob.glob(os.path.join(data_dir, "*.json")):
+_crfcut_ok = None
+
+def sentence_splitter():
+    """
+    ตัวแบ่งประโยคของ chunker "thai": crfcut ของ pythainlp (ต้องมี python-crfsuite)
+    ไม่ fallback เงียบ ๆ: ตัวแบ่งอื่นได้ chunk คนละชุด corpus และ manifest จะไม่ตรงกับเครื่องอื่น
+    """
+    global _crfcut_ok
+    if _crfcut_ok is None:
+        try:
+            from pythainlp.tokenize import sent_tokenize
+            sent_tokenize("ทดสอบ", engine="crfcut")
+            _crfcut_ok = True
+        except ImportError:
+            _crfcut_ok = False
+    if not _crfcut_ok:
+        raise RuntimeError('chunker "thai" ต้องใช้ crfcut ของ pythainlp แต่ import python-crfsuite ไม่ได้ '
+                           "(pip install -r requirements.txt หรือใช้ --chunker words)")
+    return "crfcut"
+
+def split_sentences(text):
+    """แบ่งประโยคด้วย crfcut ของ pythainlp"""
+    sentence_splitter()
+    from pythainlp.tokenize import sent_tokenize
+    return [s.strip() for s in sent_tokenize(text, engine="crfcut") if s.strip()]
+
+def split_long_sentence(sentence, max_tokens):
+    """ประโยคที่ยาวเกิน budget ตัดเป็นคำด้วย pythainlp แล้วรวมให้แต่ละท่อนไม่เกิน budget"""
+    from pythainlp.tokenize import word_tokenize
+    pieces, current, current_tokens = [], "", 0
+    for word in word_tokenize(sentence, engine="newmm", keep_whitespace=True):
+        n = count_tokens(word)
+        if current and current_tokens + n > max_tokens:
+            pieces.append(current.strip())
+            current, current_tokens = "", 0
+        current += word
+        current_tokens += n
+    if current.strip():
+        pieces.append(current.strip())
+    return pieces
+
+def chunk_text_thai(text, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """
+    รวมประโยคเป็น chunk ตาม token budget (ไม่ใช่จำนวนคำที่คั่นด้วยช่องว่าง)
+    overlap เป็นประโยคท้าย chunk ก่อนหน้าที่รวมกันไม่เกิน overlap_tokens
+    """
+    units = []
+    for sent in split_sentences(text):
+        n = count_tokens(sent)
+        if n > max_tokens:
+            units.extend((p, count_tokens(p)) for p in split_long_sentence(sent, max_tokens))
+        else:
+            units.append((sent, n))
+
+    chunks, current, current_tokens = [], [], 0
+    for sent, n in units:
+        if current and current_tokens + n > max_tokens:
+            chunks.append(" ".join(s for s, _ in current))
+            # เก็บประโยคท้าย ๆ ไว้เป็น overlap ของ chunk ถัดไป
+            carry, carry_tokens = [], 0
+            for prev, pn in reversed(current):
+                if carry_tokens + pn > overlap_tokens:
+                    break
+                carry.insert(0, (prev, pn))
+                carry_tokens += pn
+            while carry and carry_tokens + n > max_tokens:
+                carry_tokens -= carry.pop(0)[1]
+            current, current_tokens = carry, carry_tokens
+        current.append((sent, n))
+        current_tokens += n
+    if current:
+        chunks.append(" ".join(s for s, _ in current))
+    return chunks
+
+def make_chunks(text, chunker=DEFAULT_CHUNKER):
+    if chunker == "words":
+        return chunk_text(text)
+    if chunker == "thai":
+        return chunk_text_thai(text)
+    raise ValueError(f"unknown chunker: {chunker}")
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def make_chunk_id(source_file, item_pos, chunk_idx, text):
+    """chunk_id จากเนื้อหา: ไฟล์ต้นทาง + ตำแหน่ง item/chunk + hash ของข้อความ"""
+    return str(uuid5(CHUNK_NAMESPACE, f"{source_file}:{item_pos}:{chunk_idx}:{text_hash(text)}"))
+
+def list_data_files(data_dir=DATA_DIR):
+    # เรียงชื่อไฟล์เสมอ ให้ลำดับใน corpus.jsonl คงที่
+    return sorted(glob.glob(os.path.join(data_dir, "*.json")))
+
+def iter_json_items(path, block_size=1 << 16):
+    """อ่าน item ทีละตัวจากไฟล์ JSON array โดยไม่ต้องโหลดทั้งไฟล์เข้าหน่วยความจำ"""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+
+        def fill():
+            nonlocal buf, pos, eof
+            block = f.read(block_size)
+            eof = not block
+            buf, pos = buf[pos:] + block, 0
+
+        def skip(chars):
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in chars:
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return
+                fill()
+
+        skip(" \t\r\n")
+        if pos >= len(buf) or buf[pos] != "[":
+            raise ValueError(f"{path}: expected a JSON array")
+        pos += 1
+        while True:
+            skip(" \t\r\n,")
+            if pos >= len(buf):
+                raise ValueError(f"{path}: unexpected end of file")
+            if buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            # ค่าที่จบพอดีท้าย buffer อาจยังอ่านไม่ครบ (เช่นตัวเลข) ให้อ่านเพิ่มก่อน
+            if end == len(buf) and not eof:
+                fill()
+                continue
+            pos = end
+            yield item
+
+def format_value(value):
+    if isinstance(value, list):
+        return ", ".join(format_value(v) for v in value)
+    if isinstance(value, dict):
+        return "; ".join(f"{FIELD_LABELS.get(k, k)}: {format_value(v)}" for k, v in value.items())
+    return str(value)
+
+def product_fields(item):
+    """
+    แยกข้อมูลสินค้า 1 ตัวเป็นส่วนย่อย: yield (field, part, shade, text)
+    ทุกส่วนขึ้นต้นด้วยชื่อสินค้า เพื่อให้ chunk อ่านเข้าใจได้ด้วยตัวเอง
+    """
+    name = " ".join(v for v in (item.get("name_th"), item.get("name_en")) if v)
+    used = set(PRODUCT_KEYS)
+    for field, keys in PRODUCT_BLOCKS:
+        used.update(keys)
+        lines = [f"{FIELD_LABELS.get(k, k)}: {format_value(item[k])}" for k in keys if k in item]
+        if lines:
+            yield field, field, None, f"{name} | " + " | ".join(lines)
+    # key ที่ไม่รู้จักแยกเป็นส่วนของตัวเอง จะได้ไม่หายไปจาก corpus
+    for key, value in item.items():
+        if key not in used:
+            yield key, key, None, f"{name} | {FIELD_LABELS.get(key, key)}: {format_value(value)}"
+    for shade_idx, shade in enumerate(item.get("shades", [])):
+        yield "shade", f"shade.{shade_idx}", shade.get("color_name"), f"{name} | {format_value(shade)}"
+
+def make_doc(fn, item_pos, item, text, src_type, field=None, shade=None):
+    doc = {
+        "id": str(uuid5(CHUNK_NAMESPACE, f"{fn}:{item_pos}")),
+        "item_pos": item_pos,
+        "product_id": item.get("product_id", None),
+        "source_file": fn,
+        "source_type": src_type,
+        "content": clean_text(text)
+    }
+    if field:
+        doc["field"] = field
+    if shade:
+        doc["shade"] = shade
+    return doc
+
+def item_to_docs(fn, item_idx, item, product_mode=DEFAULT_PRODUCT_MODE):
+    if "question" in item and "solution" in item:
+        yield make_doc(fn, item_idx, item, f"Q: {item['question']}\nA: {item['solution']}", "faq")
+    elif "complaint" in item:
+        yield make_doc(fn, item_idx, item, f"Complaint: {item.get('complaint')}\nDetail: {item.get('detail','')}", "complaint")
+    elif product_mode == "structured":
+        for field, part, shade, text in product_fields(item):
+            yield make_doc(fn, f"{item_idx}.{part}", item, text, "product", field=field, shade=shade)
+    else:
+        yield make_doc(fn, item_idx, item, json.dumps(item, ensure_ascii=False), "product")
+
+def iter_docs(paths, product_mode=DEFAULT_PRODUCT_MODE):
+    for path in paths:
         fn = os.path.basename(path)
-        with open(path, "r", encoding="utf-8") as f:
-            arr = json.load(f)
-        for item in arr:
-            prod_id = item.get("product_id", None)
-            if "question" in item and "solution" in item:
-                text = f"Q: {item['question']}\nA: {item['solution']}"
-                src_type = "faq"
-            elif "complaint" in item:
-                text = f"Complaint: {item.get('complaint')}\nDetail: {item.get('detail','')}"
-                src_type = "complaint"
-            else:
-                text = json.dumps(item, ensure_ascii=False)
-                src_type = "product"
-            docs.append({
-                "id": str(uuid4()),
-                "product_id": prod_id,
-                "source_file": fn,
-                "source_type": src_type,
-                "content": clean_text(text),
-                "raw": item
-            })
-    return docs
-
-def main():
-    docs = load_all_json()
-    chunks = []
+        for item_idx, item in enumerate(iter_json_items(path)):
+            yield from item_to_docs(fn, item_idx, item, product_mode)
+
+def load_all_json(data_dir=DATA_DIR, paths=None, product_mode=DEFAULT_PRODUCT_MODE):
+    if paths is None:
+        paths = list_data_files(data_dir)
+    return list(iter_docs(paths, product_mode))
+
+def iter_chunks(docs, chunker=DEFAULT_CHUNKER):
     for d in docs:
-        for c in chunk_text(d["content"]):
-            chunks.append({
-                "chunk_id": str(uuid4()),
+        for chunk_idx, c in enumerate(make_chunks(d["content"], chunker)):
+            chunk = {
+                "chunk_id": make_chunk_id(d["source_file"], d["item_pos"], chunk_idx, c),
                 "product_id": d["product_id"],
                 "source_file": d["source_file"],
                 "source_type": d["source_type"],
                 "text": c
-            })
-    # save corpus
-    with open(CORPUS_FILE, "w", encoding="utf-8") as f:
-        for c in chunks:
-            f.write(json.dumps(c, ensure_ascii=False) + "\n")
-    print(f"[INFO] Saved {len(chunks)} chunks to {CORPUS_FILE}")
+            }
+            for key in ("field", "shade"):
+                if key in d:
+                    chunk[key] = d[key]
+            yield chunk
+
+def render_file(path, chunker=DEFAULT_CHUNKER, product_mode=DEFAULT_PRODUCT_MODE):
+    """แปลงไฟล์ข้อมูล 1 ไฟล์เป็นบรรทัดของ corpus (ใช้ทั้งแบบ serial และใน worker process)"""
+    return [
+        (c["chunk_id"], json.dumps(c, ensure_ascii=False) + "\n")
+        for c in iter_chunks(iter_docs([path], product_mode), chunker)
+    ]
+
+def ingest_settings(chunker, product_mode, dedup_chunks=False):
+    if chunker == "words":
+        settings = {"chunker": "words", "chunk_size": 300, "overlap": 50}
+    else:
+        settings = {"chunker": chunker, "max_tokens": CHUNK_MAX_TOKENS,
+                    "overlap_tokens": CHUNK_OVERLAP_TOKENS, "tokenizer": tokenizer_name(),
+                    # เปลี่ยนตัวแบ่งประโยคหรือ tokenizer แล้ว chunk เปลี่ยน ต้อง ingest ใหม่ทั้งหมด
+                    "sentence_splitter": sentence_splitter()}
+    settings["product_mode"] = product_mode
+    settings["dedup"] = dedup_chunks
+    return settings
+
+def load_manifest(manifest_file=MANIFEST_FILE):
+    if not os.path.exists(manifest_file):
+        return {"files": {}}
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest, manifest_file=MANIFEST_FILE):
+    tmp = manifest_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, manifest_file)
+
+def iter_corpus_runs(corpus_file=CORPUS_FILE):
+    """อ่าน corpus เดิมทีละไฟล์ต้นทาง: yield (source_file, [(chunk_id, line), ...])"""
+    if not os.path.exists(corpus_file):
+        return
+    run_file, run = None, []
+    with open(corpus_file, "r", encoding="utf-8") as f:
+        for line in f:
+            item = json.loads(line)
+            if item["source_file"] != run_file and run:
+                yield run_file, run
+                run = []
+            run_file = item["source_file"]
+            run.append((item["chunk_id"], line))
+    if run:
+        yield run_file, run
+
+def main(incremental=False, workers=1, chunker=DEFAULT_CHUNKER, product_mode=DEFAULT_PRODUCT_MODE, dedup_chunks=False, data_dir=DATA_DIR, corpus_file=CORPUS_FILE, manifest_file=MANIFEST_FILE):
+    paths = list_data_files(data_dir)
+    hashes = {os.path.basename(p): file_hash(p) for p in paths}
+    old_manifest = load_manifest(manifest_file)
+    old_files = old_manifest.get("files", {})
+    settings = ingest_settings(chunker, product_mode, dedup_chunks)
+
+    # ไม่มี corpus/manifest เดิมให้ต่อยอด หรือเปลี่ยนวิธี chunk ต้อง ingest ทั้งหมด
+    if incremental and not (os.path.exists(corpus_file) and old_files):
+        incremental = False
+    if incremental and old_manifest.get("settings") != settings:
+        incremental = False
+
+    def is_unchanged(fn):
+        old = old_files.get(fn, {})
+        return incremental and old.get("sha256") == hashes[fn] and old.get("chunks", 0) > 0
+
+    # กระจายไฟล์ที่ต้อง chunk ใหม่ให้ worker; imap คืนผลตามลำดับไฟล์ ผลลัพธ์จึงเหมือนแบบ serial ทุก byte
+    to_render = [p for p in paths if not is_unchanged(os.path.basename(p))]
+    pool = Pool(workers) if workers > 1 else None
+    render = partial(render_file, chunker=chunker, product_mode=product_mode)
+    rendered = pool.imap(render, to_render) if pool else map(render, to_render)
+
+    # corpus เรียงตามชื่อไฟล์เหมือน paths จึง merge ทีละไฟล์แบบ streaming ได้
+    old_runs = iter_corpus_runs(corpus_file)
+    pending = next(old_runs, None)
+    old_ids, new_ids = set(), set()
+    changed_names, removed_files = [], []
+    manifest = {"settings": settings, "files": {}}
+    total = 0
+
+    tmp = corpus_file + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as out:
+            for p in paths:
+                fn = os.path.basename(p)
+                old_run = []
+                while pending is not None and pending[0] <= fn:
+                    if pending[0] == fn:
+                        old_run = pending[1]
+                    else:
+                        removed_files.append(pending[0])
+                        old_ids.update(cid for cid, _ in pending[1])
+                    pending = next(old_runs, None)
+
+                if not is_unchanged(fn):
+                    file_lines = next(rendered)
+                elif not old_run:
+                    # manifest บอกว่าไม่เปลี่ยน แต่ corpus เดิมไม่มี chunk ของไฟล์นี้
+                    file_lines = render(p)
+                else:
+                    file_lines = None
+
+                if file_lines is None:
+                    for _, line in old_run:
+                        out.write(line)
+                    n = len(old_run)
+                else:
+                    changed_names.append(fn)
+                    old_ids.update(cid for cid, _ in old_run)
+                    for cid, line in file_lines:
+                        out.write(line)
+                        new_ids.add(cid)
+                    n = len(file_lines)
+                manifest["files"][fn] = {"sha256": hashes[fn], "chunks": n}
+                total += n
+
+            while pending is not None:
+                removed_files.append(pending[0])
+                old_ids.update(cid for cid, _ in pending[1])
+                pending = next(old_runs, None)
+    except BaseException:
+        # ไม่ต้องรอ worker chunk ไฟล์ที่เหลือ และไม่ทิ้ง corpus ที่เขียนไม่ครบไว้
+        if pool:
+            pool.terminate()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    # dedup ทำทั้ง corpus เสมอ เพราะไฟล์ที่ไม่เปลี่ยนก็อาจซ้ำกับ chunk ใหม่ได้ และทำบนไฟล์ชั่วคราวก่อนสลับ
+    # dedup ล้มก็ไม่เหลือ corpus ที่ยังไม่ได้ทำเครื่องหมายซ้ำคู่กับ manifest เก่า
+    try:
+        dedup_report = dedup.dedup_corpus(tmp) if dedup_chunks else None
+    except BaseException:
+        os.remove(tmp)
+        raise
+    os.replace(tmp, corpus_file)
+    save_manifest(manifest, manifest_file)
+
+    changes = {
+        "changed_files": changed_names,
+        "removed_files": removed_files,
+        "added": sorted(new_ids - old_ids),
+        "removed": sorted(old_ids - new_ids),
+        "dedup": dedup_report,
+    }
+    print(f"[INFO] Saved {total} chunks to {corpus_file}")
+    print(f"[INFO] Re-chunked {len(changed_names)}/{len(paths)} files, "
+          f"{len(changes['added'])} chunks added, {len(changes['removed'])} removed")
+    return changes
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Build corpus.jsonl from data/*.json")
+    parser.add_argument("--incremental", action="store_true",
+                        help="re-chunk only files whose content hash changed since the last run")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes used to parse, clean and chunk data files")
+    parser.add_argument("--chunker", choices=CHUNKERS, default=DEFAULT_CHUNKER,
+                        help="thai: pythainlp sentences packed to a token budget; words: legacy whitespace chunks")
+    parser.add_argument("--binary", action="store_true",
+                        help="also write corpus.bin, an mmap-able store with O(1) lookup by chunk_id/product_id")
+    parser.add_argument("--dedup", action="store_true",
+                        help="mark near-duplicate FAQ/complaint chunks within a product so they are indexed once")
+    parser.add_argument("--product-mode", choices=PRODUCT_MODES, default=DEFAULT_PRODUCT_MODE,
+                        help="structured: one chunk per shade/feature list/price block; blob: whole product JSON")
+    args = parser.parse_args()
+    main(incremental=args.incremental, workers=args.workers, chunker=args.chunker, product_mode=args.product_mode,
+         dedup_chunks=args.dedup)
+    if args.binary:
+        corpus_store.build_store(CORPUS_FILE, corpus_store.STORE_FILE)
@@ -0,0 +1,110 @@
+"""
+Inverted index แบบ BM25 บนคำที่ตัดด้วย pythainlp (newmm) แยกตาม product_id
+
+คำถามสั้น ๆ ที่มีศัพท์เฉพาะของสินค้า ("ล้างยังไง", "ไม่ติด") มักตรงกับ chunk แบบคำต่อคำดีกว่าตามความหมาย
+index.py สร้าง lexical_index.json ใน generation เดียวกับ vector index และ retrieval.py ใช้ผลค้นนี้
+fuse กับผลค้นเวกเตอร์ หรือตอบจากผลนี้อย่างเดียวเมื่อมั่นใจพอ (ไม่ต้อง embed คำถาม)
+"""
+import os, re, json, math, threading, unicodedata
+from collections import Counter
+
+import generations
+from hits import Hit
+
+LEXICAL_FILE = "lexical_index.json"
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_WORD = re.compile(r"\w")
+
+def tokenize(text):
+    from pythainlp.tokenize import word_tokenize
+    text = unicodedata.normalize("NFC", text).lower()
+    return [t for t in word_tokenize(text, engine="newmm", keep_whitespace=False) if _WORD.search(t)]
+
+def build_index(items):
+    """dict ของ index: ต่อ product_id มี chunk, ความยาว (จำนวนคำ) และ postings term -> [[doc, tf], ...]"""
+    products = {}
+    for it in items:
+        if it.get("duplicate_of"):
+            continue
+        shard = products.setdefault(it.get("product_id") or "", {"docs": [], "lengths": [], "postings": {}})
+        doc = len(shard["docs"])
+        terms = Counter(tokenize(it["text"]))
+        shard["docs"].append({"text": it["text"], "metadata": {k: v for k, v in it.items() if k != "text"}})
+        shard["lengths"].append(sum(terms.values()))
+        for term, tf in terms.items():
+            shard["postings"].setdefault(term, []).append([doc, tf])
+    return {"k1": BM25_K1, "b": BM25_B, "products": products}
+
+def build(items, path=LEXICAL_FILE):
+    data = build_index(items)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    n = sum(len(p["docs"]) for p in data["products"].values())
+    print(f"[INFO] Built lexical index with {n} chunks in {path}")
+    return n
+
+class LexicalIndex:
+    def __init__(self, data):
+        self.k1, self.b = data["k1"], data["b"]
+        self.products = data["products"]
+        self._avgdl = {pid: (sum(p["lengths"]) / len(p["lengths"]) if p["lengths"] else 0.0)
+                       for pid, p in self.products.items()}
+
+    @classmethod
+    def load(cls, path=LEXICAL_FILE):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def search(self, question, product_id, k=6):
+        """
+        คืน [(Hit, coverage)] เรียงตามคะแนน BM25
+        coverage คือสัดส่วนของคำในคำถาม (ไม่นับซ้ำ) ที่พบใน chunk นั้น
+        """
+        pid = product_id or ""
+        shard = self.products.get(pid)
+        terms = set(tokenize(question))
+        if not shard or not terms:
+            return []
+
+        n_docs, avgdl = len(shard["docs"]), self._avgdl[pid] or 1.0
+        scores, matched = {}, {}
+        for term in terms:
+            postings = shard["postings"].get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, tf in postings:
+                norm = tf + self.k1 * (1 - self.b + self.b * shard["lengths"][doc] / avgdl)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / norm
+                matched[doc] = matched.get(doc, 0) + 1
+
+        top = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [(Hit(shard["docs"][d]["text"], dict(shard["docs"][d]["metadata"]), scores[d]),
+                 matched[d] / len(terms)) for d in top]
+
+_lock = threading.Lock()
+_loaded = {}
+
+def get_lexical_index(path=None):
+    """
+    LexicalIndex ของ generation ปัจจุบัน (หรือ path ที่ส่งมา) ที่โหลดไว้ต่อ process
+    โหลดใหม่เมื่อไฟล์เปลี่ยน; None ถ้ายังไม่เคยสร้าง
+    """
+    resolved = path or generations.current_path(LEXICAL_FILE)
+    if resolved is None:
+        return None
+    try:
+        version = (os.path.abspath(resolved), os.stat(resolved).st_mtime_ns)
+    except FileNotFoundError:
+        return None
+    with _lock:
+        cached = _loaded.get(path)
+        if cached and cached[0] == version:
+            return cached[1]
+        index = LexicalIndex.load(resolved)
+        _loaded[path] = (version, index)
+        return index
@@ -0,0 +1,102 @@
+"""
+ตัวช่วยให้ process ที่กำลังรันอยู่ (หน้า Streamlit, query.py) เห็น index ใหม่โดยไม่ต้อง restart
+
+index.py / watch.py publish index เป็น generation ใหม่ใน indexes/ (ดู generations.py)
+get_chroma()/get_vector_store() เก็บ store ที่เปิดไว้ต่อ process และเปิดใหม่เมื่อ indexes/CURRENT
+ชี้ไป generation อื่น (รวมถึงตอน rollback) generation เดิมไม่ถูกแก้ query ที่ค้างอยู่จึงอ่านต่อได้
+"""
+import os, threading
+
+import generations
+
+PERSIST_DIR = "chroma_db"
+COLLECTION_NAME = "kage_products"
+
+_lock = threading.Lock()
+_open = {}
+
+def clear_chroma_cache():
+    # chromadb เก็บ client ต่อ path ไว้ใน process ถ้าไม่ล้างจะได้ segment เดิมที่ยังไม่เห็นข้อมูลใหม่
+    try:
+        from chromadb.api.client import SharedSystemClient
+        SharedSystemClient.clear_system_cache()
+    except (ImportError, AttributeError):
+        pass
+
+def resolve(name, path=None):
+    """path ที่ส่งมาตรง ๆ หรือ component ของ generation ปัจจุบัน"""
+    path = path or generations.current_path(name)
+    if path is None:
+        raise FileNotFoundError(f"no index generation in {generations.INDEX_ROOT}/ yet; run python index.py")
+    if not os.path.exists(path):
+        # ไม่ให้ Chroma สร้าง DB ว่างใน generation ที่ publish แล้วและคืนผลว่างเงียบ ๆ
+        raise FileNotFoundError(f"{path} does not exist; build it with python index.py --backend "
+                                + ("numpy" if name == "vector_index" else "chroma"))
+    return os.path.abspath(path)
+
+def chroma_write_paths(persist_dir, collection_name):
+    """
+    path (relative กับ generation) ใน persist_dir ที่ Chroma แก้ในที่เมื่อเขียน collection นี้: ไฟล์ SQLite
+    และ HNSW segment ของ collection ส่วนที่เหลือ hard link ได้ ถ้าอ่าน schema ไม่ได้คืนทั้งโฟลเดอร์
+    """
+    if not persist_dir or not os.path.isdir(persist_dir):
+        return [PERSIST_DIR]
+    paths = [os.path.join(PERSIST_DIR, name) for name in os.listdir(persist_dir) if name.startswith("chroma.sqlite3")]
+    try:
+        import sqlite3
+        conn = sqlite3.connect(f"file:{os.path.join(persist_dir, 'chroma.sqlite3')}?mode=ro", uri=True)
+        try:
+            rows = conn.execute("SELECT s.id FROM segments s JOIN collections c ON s.collection = c.id "
+                                "WHERE c.name = ? AND s.scope = 'VECTOR'", (collection_name,)).fetchall()
+        finally:
+            conn.close()
+    except Exception:
+        return [PERSIST_DIR]
+    return paths + [os.path.join(PERSIST_DIR, str(segment)) for (segment,) in rows]
+
+def get_chroma(embedding, persist_dir=None, collection_name=None):
+    from langchain_community.vectorstores import Chroma
+
+    if collection_name is None:
+        # ชื่อ collection ขึ้นกับ EMBEDDING_PROVIDER ใน config.py
+        from embeddings import collection_name as provider_collection
+        collection_name = provider_collection(base=COLLECTION_NAME)
+    path = resolve(PERSIST_DIR, persist_dir)
+    key = ("chroma", persist_dir, collection_name)
+    with _lock:
+        cached = _open.get(key)
+        if cached and cached[0] == path:
+            return cached[1]
+        if cached:
+            clear_chroma_cache()
+        db = Chroma(
+            persist_directory=path,
+            embedding_function=embedding,
+            collection_name=collection_name
+        )
+        _open[key] = (path, db)
+        return db
+
+def get_numpy_store(embedding, path=None):
+    import vector_store
+
+    resolved = resolve(vector_store.VECTOR_DIR, path)
+    key = ("numpy", path)
+    with _lock:
+        cached = _open.get(key)
+        if cached and cached[0] == resolved:
+            return cached[1]
+        store = vector_store.NumpyVectorStore(embedding, resolved)
+        _open[key] = (resolved, store)
+        return store
+
+def get_vector_store(embedding, backend=None):
+    """store สำหรับ retrieval ตาม VECTOR_BACKEND ใน config.py"""
+    if backend is None:
+        from config import VECTOR_BACKEND
+        backend = VECTOR_BACKEND
+    if backend == "numpy":
+        return get_numpy_store(embedding)
+    if backend == "chroma":
+        return get_chroma(embedding)
+    raise ValueError(f"unknown vector backend: {backend}")
@@ -2,11 +2,9 @@ import streamlit as st
 from PIL import Image
 import os
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings 
-from langchain_community.vectorstores import Chroma
-from langchain_openai import ChatOpenAI
+import rag_runtime
+import chat_ui
 from langchain_core.prompts import PromptTemplate
-from datetime import datetime  
 import traceback
 
 st.set_page_config(
@@ -62,24 +60,9 @@ st.markdown("""
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-PERSIST_DIR = "chroma_db"
-llm_ready = True
-db = None
-
-if OPENAI_API_KEY:
-    try:
-        emb = OpenAIEmbeddings(model="text-embedding-3-small", openai_api_key=OPENAI_API_KEY)
-        db = Chroma(
-            persist_directory=PERSIST_DIR,
-            embedding_function=emb,
-            collection_name="kage_products"
-        )
-        llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0.1, openai_api_key=OPENAI_API_KEY)
-    except Exception as e:
-        llm_ready = False
-        st.session_state.setdefault("_internal_errors", []).append(traceback.format_exc())
-else:
-    llm_ready = False
+# embedder, vector store และ LLM อยู่ใน rag_runtime สร้างครั้งเดียวต่อ process ตอนถามคำถามแรก
+# (rerun ของหน้านี้และหน้าสินค้าอื่นใช้ชุดเดียวกัน)
+llm_ready = bool(OPENAI_API_KEY)
 
 prompt_template = """คุณคือเพศหญิง ที่เป็นผู้ช่วยตอบลูกค้าเกี่ยวกับสินค้า KAGE — ใช้เฉพาะข้อมูลต่อไปนี้เพื่อให้คำตอบ อย่าเดาหาข้อมูลที่ไม่มีในแหล่งข้อมูล หากข้อมูลไม่พอ ให้แจ้งว่าต้องการข้อมูลเพิ่มและนำทางลูกค้าอย่างสุภาพ
 
@@ -97,108 +80,85 @@ Instructions:
 - ถ้าต้องการข้อมูลเพิ่ม ให้ถามคำถามเชิงเฉพาะ
 """
 
-def build_prompt(retrieved_docs):
-    context = ""
-    for idx, doc in enumerate(retrieved_docs, 1):
-        meta = getattr(doc, "metadata", {}) or {}
-        source_file = meta.get("source_file", "unknown")
-        page_content = getattr(doc, "page_content", str(doc))
-        context += f"[{idx}] ({source_file}) {page_content}\n"
-    return context
-
-def answer_question(question, product_id=None, k=6):
+def answer_question_stream(question, product_id=None, k=6):
     """
-    ตอบคำถามเกี่ยวกับสินค้าหน้านี้ (FIXED_PRODUCT_ID)
+    ตอบคำถามเกี่ยวกับสินค้าหน้านี้ (FIXED_PRODUCT_ID) แบบ streaming
+    คืน rag_runtime.AnswerStream ที่ iterate ได้ข้อความทีละส่วนตามที่ LLM ส่งมา หลังจบมี .answer และ .sources
     - product_id: ถ้ามี จะถูก override ให้เป็น FIXED_PRODUCT_ID (ตามโครงสร้างหน้าปัจจุบัน)
     - k: จำนวน chunk ที่จะดึง
     """
 
     product_id = FIXED_PRODUCT_ID 
-    filter = {"product_id": product_id}
 
-    if not llm_ready or db is None:
-        return {"answer": "เนื่องจาก API Key หรือฐานข้อมูลไม่พร้อมใช้งาน ระบบจึงไม่สามารถดึงข้อมูลจาก LLM ได้ กรุณาตรวจสอบการตั้งค่า OPENAI_API_KEY หรือไฟล์ DB.", "sources": []}
+    if not llm_ready:
+        return rag_runtime.AnswerStream(answer="เนื่องจาก API Key หรือฐานข้อมูลไม่พร้อมใช้งาน ระบบจึงไม่สามารถดึงข้อมูลจาก LLM ได้ กรุณาตรวจสอบการตั้งค่า OPENAI_API_KEY หรือไฟล์ DB.")
 
     try:
-        try:
-            retrieved_docs = db.similarity_search(question, k=k, filter=filter)
-        except TypeError:
-            retrieved_docs = db.similarity_search(query=question, k=k, filter=filter)
+        # คำถามที่แทบจะเหมือน FAQ ของสินค้านี้ ตอบด้วย solution ที่เก็บไว้เลย (ไม่เรียก LLM)
+        faq = rag_runtime.faq_answer(question, product_id)
+        if faq:
+            return rag_runtime.AnswerStream(answer=faq["answer"], sources=faq["sources"])
+        cached = rag_runtime.cached_answer(question, product_id)
+        if cached:
+            return rag_runtime.AnswerStream(answer=cached["answer"], sources=cached["sources"])
+        retrieved_docs = rag_runtime.retrieve(question, product_id, k=k)
+        cached = rag_runtime.similar_answer(product_id, retrieved_docs)
+        if cached:
+            return rag_runtime.AnswerStream(answer=cached["answer"], sources=cached["sources"])
+        # ตัดส่วนซ้ำ/chunk ที่ไม่เกี่ยวข้อง แล้วจัดให้พอดี token budget (context_packer.py)
+        used_docs, context_text, context_report = rag_runtime.pack_context(question, retrieved_docs)
     except Exception as e:
         st.session_state.setdefault("_internal_errors", []).append(traceback.format_exc())
-        return {"answer": "เกิดข้อผิดพลาดขณะค้นหาข้อมูลในฐานความรู้ กรุณาลองใหม่อีกครั้ง", "sources": []}
+        return rag_runtime.AnswerStream(answer="เกิดข้อผิดพลาดขณะค้นหาข้อมูลในฐานความรู้ กรุณาลองใหม่อีกครั้ง")
 
-    context_text = build_prompt(retrieved_docs) if retrieved_docs else " (ไม่มีข้อมูลที่เกี่ยวข้องในฐานข้อมูลสำหรับสินค้านี้) "
+    if not used_docs:
+        context_text = " (ไม่มีข้อมูลที่เกี่ยวข้องในฐานข้อมูลสำหรับสินค้านี้) "
 
     problem_keywords = ["เสีย", "พัง", "แก้", "ไม่ติด", "ทำยังไง", "ล้างยังไง"]
     is_problem = any(word in question.lower() for word in problem_keywords)
 
     custom_prompt = prompt_template
+    llm_error = "เกิดข้อผิดพลาดขณะเรียกโมเดล LLM กรุณาตรวจสอบการตั้งค่า API หรือสภาวะแวดล้อม"
 
     try:
         prompt_obj = PromptTemplate(input_variables=["context", "question"], template=custom_prompt)
         prompt_text = prompt_obj.format(context=context_text, question=question)
-        answer = llm.predict(prompt_text)
     except Exception as e:
         st.session_state.setdefault("_internal_errors", []).append(traceback.format_exc())
-        return {"answer": "เกิดข้อผิดพลาดขณะเรียกโมเดล LLM กรุณาตรวจสอบการตั้งค่า API หรือสภาวะแวดล้อม", "sources": []}
+        return rag_runtime.AnswerStream(answer=llm_error)
 
     sources = []
-    for doc in retrieved_docs:
+    for doc in used_docs:
         meta = getattr(doc, "metadata", {}) or {}
         sources.append({"source_file": meta.get("source_file", "unknown"), "chunk_id": meta.get("chunk_id", "unknown")})
 
-    return {"answer": answer, "sources": sources}
+    # error ระหว่าง stream (เรียก LLM ไม่สำเร็จ) แสดง llm_error แทนและเก็บ traceback ไว้เหมือนเดิม
+    return rag_runtime.AnswerStream(
+        prompt_text, sources, question=question, product_id=product_id, error_answer=llm_error,
+        on_error=lambda tb: st.session_state.setdefault("_internal_errors", []).append(tb),
+        context_report=context_report, query_vector=getattr(retrieved_docs, "query_vector", None),
+    )
 
-def display_chat_message_content(message):
-    content = message["content"]
-    timestamp = message.get("time", "") 
-    
-    full_content = f"<span style='font-size: 0.8em; color: gray;'>({timestamp})</span> {content}"
-    
-    st.markdown(full_content, unsafe_allow_html=True) 
+def answer_question(question, product_id=None, k=6):
+    """answer_question_stream แบบรอคำตอบเต็ม คืน {"answer": ..., "sources": [...]}"""
+    stream = answer_question_stream(question, product_id=product_id, k=k)
+    for _ in stream:
+        pass
+    return stream.result()
 
+# ประวัติแชท, TTFT และแหล่งข้อมูลของแต่ละคำตอบแสดงผ่าน chat_ui (ใช้ร่วมกันทุกหน้าสินค้า)
 chat_container = st.container()
 
 with chat_container:
-    for msg in st.session_state[CURRENT_PAGE_KEY]:
-        avatar = "💖" if msg["role"] == "assistant" else "🙋‍♀️" 
-        with st.chat_message(msg["role"], avatar=avatar):
-            display_chat_message_content(msg)
+    chat_ui.show_history(st.session_state[CURRENT_PAGE_KEY])
 
 prompt = st.chat_input("พิมพ์คำถามของลูกค้า...")
 
 if prompt:
-    current_time = datetime.now().strftime("%H:%M") 
-
-    st.session_state[CURRENT_PAGE_KEY].append({
-        "role": "user", 
-        "content": prompt, 
-        "sources": [], 
-        "time": current_time 
-    })
-    
-    with st.chat_message("user", avatar="🙋‍♀️"): 
-        st.markdown(f"<span style='font-size: 0.8em; color: gray;'>({current_time})</span> {prompt}", unsafe_allow_html=True) 
-
     product_id = FIXED_PRODUCT_ID
     st.session_state["product_context"] = product_id
-    
-    with st.chat_message("assistant", avatar="💖"): 
-        with st.spinner("กำลังดึงข้อมูลและตอบคำถาม..."):
-            resp = answer_question(question=prompt, product_id=product_id)
-        
-        assistant_time = datetime.now().strftime("%H:%M") 
-
-        st.markdown(f"<span style='font-size: 0.8em; color: gray;'>({assistant_time})</span> {resp['answer']}", unsafe_allow_html=True) 
-        
-        st.session_state[CURRENT_PAGE_KEY].append({ 
-            "role":"assistant",
-            "content": resp["answer"],
-            "context_used": True,
-            "sources": resp.get("sources", []),
-            "time": assistant_time 
-        })
+    chat_ui.answer_turn(st.session_state[CURRENT_PAGE_KEY], prompt,
+                        lambda question: answer_question_stream(question=question, product_id=product_id))
 
 PASTEL_BLUE = "#AEC6CF" 
 ACCENT_BLUE = "#779ECB" 
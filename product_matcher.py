@@ -0,0 +1,156 @@
+"""
+หาสินค้าจากชื่อ/ชื่อเล่นในคำถาม (ใช้ใน query.find_product_by_name)
+
+1. Aho-Corasick automaton ของทุก alias: สแกนคำถามรอบเดียว เวลาเป็นเส้นตรงตามความยาวคำถาม
+   ไม่ว่าจะมี alias กี่พันคำ ถ้าเจอหลายคำเลือกคำที่ยาวที่สุด (เจอก่อนชนะเมื่อยาวเท่ากัน)
+2. ถ้าไม่เจอเลย ค่อยลองแบบสะกดผิด: ตัดคำถามด้วย pythainlp แล้วเอาคำที่ติดกัน 1–3 คำไปค้นใน BK-tree
+   ของ alias ด้วย edit distance (alias สั้นกว่า FUZZY_MIN_LENGTH ไม่ค้นแบบนี้ เพราะผิดตัวเดียวก็กลายเป็นคำอื่น)
+"""
+import unicodedata
+from collections import deque
+
+FUZZY_MIN_LENGTH = 4
+FUZZY_MAX_TOKENS = 3
+
+def normalize(text):
+    return " ".join(unicodedata.normalize("NFC", text).casefold().split())
+
+def max_distance(length):
+    """จำนวนตัวอักษรที่ยอมให้ผิดตามความยาวของ alias"""
+    if length < FUZZY_MIN_LENGTH:
+        return 0
+    return 1 if length < 8 else 2
+
+def edit_distance(a, b, limit=None):
+    """Levenshtein distance; หยุดเร็วเมื่อเกิน limit (คืน limit + 1)"""
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if limit is not None and min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+class AhoCorasick:
+    def __init__(self, words):
+        self.goto = [{}]
+        self.fail = [0]
+        self.best = [None]  # alias ที่ยาวที่สุดที่จบที่ node นี้ (รวมผ่าน fail link)
+        for word in words:
+            node = 0
+            for ch in word:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.best.append(None)
+                node = nxt
+            self.best[node] = word
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                # node ลึกกว่า fail ของมันเสมอ alias ของตัวเองจึงยาวกว่า
+                if self.best[nxt] is None:
+                    self.best[nxt] = self.best[self.fail[nxt]]
+                queue.append(nxt)
+
+    def longest(self, text):
+        """alias ที่ยาวที่สุดที่อยู่ใน text (หรือ None)"""
+        node, found = 0, None
+        for ch in text:
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            word = self.best[node]
+            if word and (found is None or len(word) > len(found)):
+                found = word
+        return found
+
+class BKTree:
+    def __init__(self, words=()):
+        self.root = None
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        if self.root is None:
+            self.root = (word, {})
+            return
+        node = self.root
+        while True:
+            d = edit_distance(word, node[0])
+            if d == 0:
+                return
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = (word, {})
+                return
+            node = child
+
+    def search(self, word, limit):
+        """[(distance, alias)] ที่ห่างจาก word ไม่เกิน limit"""
+        found, stack = [], [self.root] if self.root else []
+        while stack:
+            alias, children = stack.pop()
+            d = edit_distance(word, alias)
+            if d <= limit:
+                found.append((d, alias))
+            for dist, child in children.items():
+                if d - limit <= dist <= d + limit:
+                    stack.append(child)
+        return found
+
+class ProductMatcher:
+    def __init__(self, aliases):
+        """aliases: {ชื่อ/ชื่อเล่น: product_id}"""
+        self.aliases = {normalize(name): pid for name, pid in aliases.items()}
+        self.automaton = AhoCorasick(self.aliases)
+        fuzzy = [a for a in self.aliases if max_distance(len(a))]
+        self.bktree = BKTree(fuzzy)
+        self.fuzzy_limit = max((max_distance(len(a)) for a in fuzzy), default=0)
+
+    def exact(self, question):
+        alias = self.automaton.longest(normalize(question))
+        return (alias, self.aliases[alias]) if alias else None
+
+    def fuzzy(self, question):
+        """(alias, product_id, distance) ที่ใกล้ที่สุดกับคำ/วลีในคำถาม หรือ None"""
+        from pythainlp.tokenize import word_tokenize
+
+        tokens = [t for t in word_tokenize(normalize(question), engine="newmm", keep_whitespace=False) if t.strip()]
+        best = None
+        for i in range(len(tokens)):
+            for n in range(1, FUZZY_MAX_TOKENS + 1):
+                if i + n > len(tokens):
+                    break
+                candidate = "".join(tokens[i:i + n])
+                if len(candidate) + self.fuzzy_limit < FUZZY_MIN_LENGTH:
+                    continue
+                for d, alias in self.bktree.search(candidate, self.fuzzy_limit):
+                    if d > max_distance(len(alias)):
+                        continue
+                    if best is None or (d, -len(alias)) < (best[2], -len(best[0])):
+                        best = (alias, self.aliases[alias], d)
+        return best
+
+    def match(self, question):
+        """product_id ของสินค้าที่ถูกพูดถึงในคำถาม หรือ None"""
+        found = self.exact(question)
+        if found:
+            return found[1]
+        found = self.fuzzy(question)
+        return found[1] if found else None
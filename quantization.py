@@ -0,0 +1,124 @@
+"""
+Quantization ของเวกเตอร์ใน vector_index/ เพื่อลด memory ที่ต้องโหลดไว้ตอนค้น
+
+    int8  scalar quantization ต่อมิติ: 1 byte/มิติ (เล็กกว่า float32 4 เท่า)
+    pq    product quantization: subvector ละ 8 มิติเก็บเป็นเลข centroid 1 byte (เล็กกว่า 32 เท่า)
+
+คะแนนที่ได้จาก codec เป็นค่าประมาณ vector_store ใช้มันคัดผู้สมัครแล้ว rescore ด้วยเวกเตอร์ float32
+ใน vectors.npy (เปิดแบบ mmap จึงอ่านจากดิสก์เฉพาะแถวของผู้สมัคร)
+"""
+import os
+
+import numpy as np
+
+QUANTIZATIONS = ("none", "int8", "pq")
+PQ_SUBVECTOR_DIM = 8
+PQ_CENTROIDS = 256
+PQ_TRAIN_ROWS = 5_000
+KMEANS_ITERATIONS = 12
+SCORE_BLOCK = 8192  # แถวต่อรอบตอนคำนวณคะแนน (จำกัด memory ชั่วคราวต่อ query)
+
+def kmeans(x, k, iterations=KMEANS_ITERATIONS, seed=0):
+    """Lloyd's k-means แบบง่าย เริ่มจากจุดสุ่มใน x; คืน centroids (k, dim)"""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = nearest(x, centroids)
+        for c in range(k):
+            members = x[assign == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+    return centroids
+
+def nearest(x, centroids):
+    dist = (centroids ** 2).sum(axis=1)[None, :] - 2 * x @ centroids.T
+    return dist.argmin(axis=1)
+
+class Int8Codec:
+    kind = "int8"
+
+    def __init__(self, scale, codes):
+        self.scale = scale
+        self.codes = codes
+
+    @classmethod
+    def train(cls, vectors):
+        scale = np.abs(vectors).max(axis=0) / 127
+        scale[scale == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+        return cls(scale.astype(np.float32), codes)
+
+    def scores(self, q):
+        qs = q * self.scale
+        out = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), SCORE_BLOCK):
+            block = self.codes[start:start + SCORE_BLOCK]
+            out[start:start + len(block)] = block.astype(np.float32) @ qs
+        return out
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.scale.nbytes
+
+    def save(self, path):
+        np.save(os.path.join(path, "int8_codes.npy"), self.codes)
+        np.save(os.path.join(path, "int8_scale.npy"), self.scale)
+
+    @classmethod
+    def load(cls, path):
+        return cls(np.load(os.path.join(path, "int8_scale.npy")), np.load(os.path.join(path, "int8_codes.npy")))
+
+class PQCodec:
+    kind = "pq"
+
+    def __init__(self, centroids, codes):
+        self.centroids = centroids  # (subvectors, centroids, PQ_SUBVECTOR_DIM)
+        self.codes = codes          # (rows, subvectors) uint8
+
+    @classmethod
+    def train(cls, vectors):
+        n, dim = vectors.shape
+        if dim % PQ_SUBVECTOR_DIM:
+            raise ValueError(f"pq needs a dimension divisible by {PQ_SUBVECTOR_DIM}, got {dim}")
+        m = dim // PQ_SUBVECTOR_DIM
+        k = min(PQ_CENTROIDS, n)
+        sub = vectors.reshape(n, m, PQ_SUBVECTOR_DIM)
+        rng = np.random.default_rng(0)
+        train_rows = rng.choice(n, min(n, PQ_TRAIN_ROWS), replace=False)
+
+        centroids = np.empty((m, k, PQ_SUBVECTOR_DIM), dtype=np.float32)
+        codes = np.empty((n, m), dtype=np.uint8)
+        for j in range(m):
+            centroids[j] = kmeans(sub[train_rows, j], k)
+            codes[:, j] = nearest(sub[:, j], centroids[j])
+        return cls(centroids, codes)
+
+    def scores(self, q):
+        m = len(self.centroids)
+        table = np.einsum("mkd,md->mk", self.centroids, q.reshape(m, PQ_SUBVECTOR_DIM))
+        cols = np.arange(m)
+        out = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), SCORE_BLOCK):
+            block = self.codes[start:start + SCORE_BLOCK]
+            out[start:start + len(block)] = table[cols, block].sum(axis=1)
+        return out
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.centroids.nbytes
+
+    def save(self, path):
+        np.save(os.path.join(path, "pq_codes.npy"), self.codes)
+        np.save(os.path.join(path, "pq_centroids.npy"), self.centroids)
+
+    @classmethod
+    def load(cls, path):
+        return cls(np.load(os.path.join(path, "pq_centroids.npy")), np.load(os.path.join(path, "pq_codes.npy")))
+
+CODECS = {"int8": Int8Codec, "pq": PQCodec}
+
+def train_codec(kind, vectors):
+    return CODECS[kind].train(vectors)
+
+def load_codec(kind, path):
+    return CODECS[kind].load(path)
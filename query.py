@@ -1,24 +1,12 @@
-import os
+import os, time
 from dotenv import load_dotenv
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.vectorstores import Chroma
-from langchain.chat_models import ChatOpenAI
-from langchain.prompts import PromptTemplate
+import rag_runtime
 
 # load API key
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-# set Chroma DB
-PERSIST_DIR = "chroma_db"
-emb = OpenAIEmbeddings(model="text-embedding-3-small", openai_api_key=OPENAI_API_KEY)
-db = Chroma(
-    persist_directory=PERSIST_DIR,
-    embedding_function=emb,
-    collection_name="kage_products"
-)
-
-llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0.1, openai_api_key=OPENAI_API_KEY)
+# embedder, vector store และ LLM สร้างครั้งแรกที่ใช้ใน rag_runtime (ใช้ร่วมกับหน้าสินค้า)
 
 # map -> product_id
 PRODUCT_NAME_MAP = {
@@ -43,12 +31,15 @@ PRODUCT_NAME_MAP = {
     "มาสคาร่าคิ้ว": "M001",
 }
 
+_matcher = None
+
 def find_product_by_name(question: str):
-    question_lower = question.lower()
-    for name, pid in PRODUCT_NAME_MAP.items():
-        if name.lower() in question_lower:
-            return pid
-    return None
+    # automaton ของ PRODUCT_NAME_MAP สร้างครั้งเดียวต่อ process (ดู product_matcher.py)
+    global _matcher
+    if _matcher is None:
+        from product_matcher import ProductMatcher
+        _matcher = ProductMatcher(PRODUCT_NAME_MAP)
+    return _matcher.match(question)
 
 prompt_template = """คุณคือเพศหญิง ที่เป็นผู้ช่วยตอบลูกค้าเกี่ยวกับสินค้า KAGE — ใช้เฉพาะข้อมูลต่อไปนี้เพื่อให้คำตอบ อย่าเดาหาข้อมูลที่ไม่มีในแหล่งข้อมูล หากข้อมูลไม่พอให้แจ้งว่าต้องการข้อมูลเพิ่มและนำทางลูกค้าอย่างสุภาพ
 
@@ -66,24 +57,41 @@ Instructions:
 - ถ้าต้องการข้อมูลเพิ่ม ให้ถามคำถามเชิงเฉพาะ
 """
 
-def build_prompt(retrieved_docs):
-    context = ""
-    for idx, doc in enumerate(retrieved_docs, 1):
-        meta = doc.metadata
-        context += f"[{idx}] ({meta.get('source_file')}) {doc.page_content}\n"
-    return context
-
-def answer_question(question, product_id=None, k=6):
+def stream_answer(question, product_id=None, k=6):
+    """
+    answer_question แบบ streaming: คืน rag_runtime.AnswerStream ที่ iterate ได้ข้อความทีละส่วน
+    ตามที่ LLM ส่งมา หลัง iterate จบมี .answer, .sources และ .first_token_seconds (นับจากตอนเรียกฟังก์ชันนี้)
+    """
+    started = time.perf_counter()
+    stream = _prepare_stream(question, product_id, k)
+    stream.started = started
+    return stream
+
+def _prepare_stream(question, product_id, k):
     # check product_id
     if not product_id:
         product_id = find_product_by_name(question)
         if not product_id:
-            return {"answer": "ไม่สามารถระบุสินค้าได้ กรุณาระบุชื่อสินค้าให้ชัดเจน", "sources": []}
+            return rag_runtime.AnswerStream(answer="ไม่สามารถระบุสินค้าได้ กรุณาระบุชื่อสินค้าให้ชัดเจน")
+
+    # คำถามที่แทบจะเหมือน FAQ: ตอบด้วย solution ของ FAQ นั้นเลย (ไม่ต้อง retrieval/LLM)
+    faq = rag_runtime.faq_answer(question, product_id)
+    if faq:
+        return rag_runtime.AnswerStream(answer=faq["answer"], sources=faq["sources"])
+
+    # คำถามเดิม (หรือความหมายเดียวกัน) ของสินค้านี้ที่เคยตอบแล้ว
+    cached = rag_runtime.cached_answer(question, product_id)
+    if cached:
+        return rag_runtime.AnswerStream(answer=cached["answer"], sources=cached["sources"])
 
     # ดึงเอกสารเฉพาะสินค้านั้น
-    filter = {"product_id": product_id}  # ส่ง filter ให้ถูกต้อง
-    retrieved_docs = db.similarity_search(query=question, k=k, filter=filter)
-    context_text = build_prompt(retrieved_docs)
+    retrieved_docs = rag_runtime.retrieve(question, product_id, k=k)
+    # คำถามความหมายเดียวกับที่เคยตอบ (เทียบด้วยเวกเตอร์ที่ retrieval embed ไว้แล้ว)
+    cached = rag_runtime.similar_answer(product_id, retrieved_docs)
+    if cached:
+        return rag_runtime.AnswerStream(answer=cached["answer"], sources=cached["sources"])
+    # ตัดส่วนซ้ำ/chunk ที่ไม่เกี่ยวข้อง แล้วจัดให้พอดี token budget (context_packer.py)
+    used_docs, context_text, context_report = rag_runtime.pack_context(question, retrieved_docs)
 
     # ตรวจสอบคำถามว่าเป็นพวกปัญหาหรือไม่
     problem_keywords = ["เสีย", "พัง", "แก้", "ไม่ติด", "ทำยังไง", "ล้างยังไง"]
@@ -96,14 +104,21 @@ def answer_question(question, product_id=None, k=6):
             "- ถ้าเป็นคำถามเกี่ยวกับปัญหา ให้เสนอแนวทางแก้ไขหรือขั้นตอนต่อไป\n", ""
         )
 
+    from langchain_core.prompts import PromptTemplate
     prompt_obj = PromptTemplate(input_variables=["context", "question"], template=custom_prompt)
     prompt_text = prompt_obj.format(context=context_text, question=question)
 
-    answer = llm.predict(prompt_text)
-
     sources = [
         {"source_file": doc.metadata.get("source_file"), "chunk_id": doc.metadata.get("chunk_id")}
-        for doc in retrieved_docs
+        for doc in used_docs
     ]
 
-    return {"answer": answer, "sources": sources}
+    return rag_runtime.AnswerStream(prompt_text, sources, question=question, product_id=product_id,
+                                    context_report=context_report,
+                                    query_vector=getattr(retrieved_docs, "query_vector", None))
+
+def answer_question(question, product_id=None, k=6):
+    stream = stream_answer(question, product_id=product_id, k=k)
+    for _ in stream:
+        pass
+    return stream.result()
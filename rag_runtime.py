@@ -0,0 +1,183 @@
+"""
+RAG runtime ที่ใช้ร่วมกันทั้ง process: embedder, retriever (vector store) และ LLM client
+
+ทุกอย่างสร้างแบบ lazy ตอนถูกใช้ครั้งแรกแล้วเก็บไว้ใน module นี้ Streamlit rerun หน้าเดิมหรือเปิดหน้าสินค้าอื่น
+จึงไม่สร้าง client ใหม่ และ import query.py ก็ไม่ต้องโหลด LangChain/OpenAI จนกว่าจะถามคำถามแรก
+vector store เปิดผ่าน live_index ซึ่งเปิดใหม่เองเมื่อ index มี generation ใหม่
+คำตอบที่ตอบไปแล้วเก็บใน answer_cache (ตามค่า ANSWER_CACHE_* ใน config.py) ถามซ้ำจึงไม่ต้องเรียก LLM
+AnswerStream ส่งคำตอบของ LLM ออกทีละส่วนตามที่ได้รับ (หน้าสินค้าแสดงด้วย st.write_stream)
+คำถามที่ตรงกับ FAQ ตอบด้วย solution ที่เก็บไว้ผ่าน faq_answer() ก่อนขั้นอื่นทั้งหมด
+"""
+import os, time, threading, traceback
+
+from live_index import get_vector_store
+import retrieval
+
+CHAT_MODEL = "gpt-3.5-turbo"
+CHAT_TEMPERATURE = 0.1
+
+_lock = threading.Lock()
+_embedder = None
+_llm = None
+_answer_cache = None
+
+# คำตอบที่ส่งออกไป (รวม FAQ/cache hit): จำนวน และผลรวม/ค่าสูงสุดของ TTFT นับจาก AnswerStream.started
+stream_stats = {"answers": 0, "first_token_seconds": 0.0, "max_first_token_seconds": 0.0}
+
+def get_embedder():
+    global _embedder
+    if _embedder is None:
+        with _lock:
+            if _embedder is None:
+                from config import QUERY_EMBEDDING_CACHE_SIZE
+                from embeddings import get_embeddings, QueryEmbeddingCache
+                embedder = get_embeddings()  # provider ตาม EMBEDDING_PROVIDER ใน config.py
+                if QUERY_EMBEDDING_CACHE_SIZE:
+                    # FAQ, store/retrieval และ context_packer embed คำถามตามที่พิมพ์ผ่านตัวนี้
+                    # (key เดียวกัน) คำถามเดิมจึง embed ครั้งเดียวตราบที่ยังอยู่ใน LRU
+                    embedder = QueryEmbeddingCache(embedder, max_entries=QUERY_EMBEDDING_CACHE_SIZE)
+                _embedder = embedder
+    return _embedder
+
+def get_store():
+    return get_vector_store(get_embedder())
+
+def get_llm():
+    global _llm
+    if _llm is None:
+        with _lock:
+            if _llm is None:
+                from langchain_openai import ChatOpenAI
+                _llm = ChatOpenAI(model_name=CHAT_MODEL, temperature=CHAT_TEMPERATURE,
+                                  openai_api_key=os.getenv("OPENAI_API_KEY"))
+    return _llm
+
+def retrieve(question, product_id, k=6):
+    """retrieval.retrieve ด้วย embedder/store ของ runtime (เปิด store เฉพาะเมื่อต้องค้นเวกเตอร์)"""
+    return retrieval.retrieve(question, product_id, k=k, embedding=get_embedder())
+
+def faq_answer(question, product_id):
+    """
+    คำตอบจาก FAQ ที่ตรงกับคำถามพอ (confidence >= FAQ_MATCH_THRESHOLD) เป็น dict เดียวกับ answer_question
+    หรือ None ถ้าไม่มี FAQ ที่ใกล้พอ/ยังไม่มี faq_index.json
+    """
+    from config import FAQ_MATCH_THRESHOLD
+    if FAQ_MATCH_THRESHOLD > 1:
+        return None
+    from faq_index import get_faq_matcher
+    matcher = get_faq_matcher(get_embedder())
+    if matcher is None:
+        return None
+    found = matcher.match(question, product_id, FAQ_MATCH_THRESHOLD)
+    return {"answer": found["answer"], "sources": found["sources"]} if found else None
+
+def pack_context(question, docs):
+    """context_packer.pack ด้วย embedder ของ runtime และ CONTEXT_TOKEN_BUDGET: คืน (docs, context, report)"""
+    import context_packer
+    from config import CONTEXT_TOKEN_BUDGET
+    return context_packer.pack(question, docs, embedding=get_embedder(), budget=CONTEXT_TOKEN_BUDGET)
+
+def get_answer_cache():
+    """AnswerCache ของ process หรือ None ถ้าปิดไว้ (ANSWER_CACHE_SIZE=0)"""
+    global _answer_cache
+    if _answer_cache is None:
+        with _lock:
+            if _answer_cache is None:
+                from config import ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, ANSWER_CACHE_THRESHOLD
+                from answer_cache import AnswerCache
+                _answer_cache = AnswerCache(max_entries=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL,
+                                            threshold=ANSWER_CACHE_THRESHOLD)
+    return _answer_cache if _answer_cache.max_entries else None
+
+def cached_answer(question, product_id):
+    """คำตอบที่เคยตอบของคำถามเดียวกัน (tier exact ไม่ embed) เรียกก่อน retrieval"""
+    cache = get_answer_cache()
+    return cache.get(product_id, question) if cache is not None else None
+
+def similar_answer(product_id, docs):
+    """
+    คำตอบของคำถามความหมายเดียวกัน (tier semantic) เรียกหลัง retrieval ด้วยผลของ retrieve
+    ใช้เวกเตอร์คำถามที่ retrieval embed ไว้แล้ว; lexical fast path ไม่มีเวกเตอร์จึงข้าม (ไม่ embed เพิ่ม)
+    """
+    cache = get_answer_cache()
+    vector = getattr(docs, "query_vector", None)
+    return cache.get_similar(product_id, vector) if cache is not None and vector is not None else None
+
+def remember_answer(question, product_id, result, query_vector=None):
+    cache = get_answer_cache()
+    if cache is not None:
+        cache.put(product_id, question, result, vector=query_vector)
+
+def record_first_token(seconds):
+    with _lock:
+        stream_stats["answers"] += 1
+        stream_stats["first_token_seconds"] += seconds
+        stream_stats["max_first_token_seconds"] = max(stream_stats["max_first_token_seconds"], seconds)
+
+def mean_first_token_seconds():
+    """TTFT เฉลี่ยของคำตอบที่ส่งออกไป (0.0 ถ้ายังไม่มี)"""
+    return stream_stats["first_token_seconds"] / stream_stats["answers"] if stream_stats["answers"] else 0.0
+
+class AnswerStream:
+    """
+    คำตอบที่ iterate ได้ทีละส่วนของข้อความตามที่ LLM stream มา
+    หลัง iterate จบ .answer คือคำตอบเต็ม, .sources คือแหล่งข้อมูล และคำตอบถูกเก็บเข้า answer cache
+    ถ้าไม่มี prompt_text (เช่น cache hit หรือข้อความแจ้งปัญหา) จะส่ง answer ออกไปทีเดียว
+
+    error_answer: ข้อความที่ส่งแทนเมื่อเรียก LLM ไม่สำเร็จ (None = ปล่อย exception ออกไป)
+    on_error: เรียกด้วย traceback เมื่อเกิด error (หน้าสินค้าเก็บลง session_state)
+    query_vector: เวกเตอร์คำถามจาก retrieval สำหรับ tier semantic ของ answer cache (None = เก็บแค่ exact)
+    started: time.perf_counter() ตอนผู้ใช้ส่งคำถาม first_token_seconds จึงรวมเวลาของ FAQ, answer cache,
+        retrieval และ context packing (None = เริ่มนับตอน iterate)
+    """
+
+    def __init__(self, prompt_text=None, sources=None, question=None, product_id=None, answer="",
+                 error_answer=None, on_error=None, context_report=None, query_vector=None, started=None):
+        self.prompt_text = prompt_text
+        self.sources = sources or []
+        self.context_report = context_report  # report ของ context_packer (token ที่ประหยัดได้ ฯลฯ)
+        self.query_vector = query_vector
+        self.started = started
+        self.question = question
+        self.product_id = product_id
+        self.answer = answer
+        self.error_answer = error_answer
+        self.on_error = on_error
+        self.failed = False
+        self.first_token_seconds = None  # เวลาถึงข้อความส่วนแรก (time-to-first-token) นับจาก started
+
+    def __iter__(self):
+        start = self.started if self.started is not None else time.perf_counter()
+        if self.prompt_text is None:
+            self.first_token_seconds = time.perf_counter() - start
+            record_first_token(self.first_token_seconds)
+            yield self.answer
+            return
+
+        parts = []
+        try:
+            for chunk in get_llm().stream(self.prompt_text):
+                text = getattr(chunk, "content", chunk)
+                if not text:
+                    continue
+                if self.first_token_seconds is None:
+                    self.first_token_seconds = time.perf_counter() - start
+                    record_first_token(self.first_token_seconds)
+                parts.append(text)
+                yield text
+        except Exception:
+            if self.error_answer is None:
+                raise
+            self.failed = True
+            if self.on_error:
+                self.on_error(traceback.format_exc())
+            text = ("\n\n" if parts else "") + self.error_answer
+            parts.append(text)
+            yield text
+
+        self.answer = "".join(parts)
+        if not self.failed:
+            remember_answer(self.question, self.product_id, self.result(), self.query_vector)
+
+    def result(self):
+        return {"answer": self.answer, "sources": self.sources}
@@ -0,0 +1,87 @@
+"""
+ขั้น retrieval ของ answer_question ที่ query.py และหน้าสินค้าใช้ร่วมกัน
+
+แยกออกจากส่วนที่เรียก LLM เพื่อให้ bench_retrieval.py วัดความเร็ว/ความแม่นของขั้นนี้ได้โดยตรง
+
+RETRIEVAL_MODE (config.py):
+    vector  ค้นเวกเตอร์อย่างเดียว
+    hybrid  ค้น BM25 (lexical_index.py) ก่อน ถ้าผลมั่นใจพอ (chunk อันดับแรกมีทุกคำในคำถาม
+            และคะแนนทิ้งอันดับสองชัดเจน) ตอบจากผลนี้เลยโดยไม่ต้อง embed คำถาม
+            ไม่อย่างนั้นรวมผล BM25 กับผลค้นเวกเตอร์ด้วย reciprocal-rank fusion
+
+retrieve คืน Retrieved (list ของ chunk) ที่บอก mode ที่ใช้จริงและเวกเตอร์คำถาม (embed ครั้งเดียวแล้ว
+ค้นด้วย similarity_search_by_vector) context_packer และ answer cache ใช้เวกเตอร์นี้ต่อโดยไม่ embed ซ้ำ
+"""
+from live_index import get_vector_store
+
+RETRIEVAL_MODES = ("vector", "hybrid")
+RRF_K = 60
+LEXICAL_MIN_COVERAGE = 1.0
+LEXICAL_MIN_MARGIN = 1.5
+CANDIDATE_FACTOR = 2  # ผู้สมัครจากแต่ละฝั่งก่อน fuse = k * CANDIDATE_FACTOR
+
+stats = {"vector": 0, "hybrid": 0, "lexical_fast_path": 0}
+
+class Retrieved(list):
+    """ผลของ retrieve: mode คือ "vector", "hybrid" หรือ "lexical_fast_path"; query_vector เป็น None ถ้าไม่ได้ embed"""
+
+    def __init__(self, docs, mode, query_vector=None):
+        super().__init__(docs)
+        self.mode = mode
+        self.query_vector = query_vector
+
+def rrf_fuse(rankings, k):
+    """reciprocal-rank fusion ของหลายลำดับผลค้น (ใช้ chunk_id เป็น key)"""
+    scores, docs = {}, {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            key = doc.metadata.get("chunk_id") or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)[:k]]
+
+def lexical_confident(results):
+    if not results:
+        return False
+    (top, coverage) = results[0]
+    if coverage < LEXICAL_MIN_COVERAGE:
+        return False
+    return len(results) == 1 or top.score >= LEXICAL_MIN_MARGIN * results[1][0].score
+
+def vector_search(store, question, k, filter, embedding=None):
+    """(ผลค้นเวกเตอร์, เวกเตอร์คำถาม) embed ด้วย embedding ที่ส่งมาหรือของ store เอง"""
+    if embedding is None:
+        # NumpyVectorStore.embedding / Chroma.embeddings (QueryEmbeddingCache ที่ว่างเป็น falsy จึงเทียบกับ None)
+        embedding = getattr(store, "embedding", None)
+        if embedding is None:
+            embedding = store.embeddings
+    query_vector = embedding.embed_query(question)
+    return store.similarity_search_by_vector(query_vector, k=k, filter=filter), query_vector
+
+def retrieve(question, product_id, k=6, store=None, embedding=None, mode=None, lexical=None):
+    """chunk ของสินค้า product_id ที่เกี่ยวกับคำถามที่สุด k อัน (store ตาม VECTOR_BACKEND ถ้าไม่ได้ส่งมา)"""
+    if mode is None:
+        from config import RETRIEVAL_MODE
+        mode = RETRIEVAL_MODE
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"unknown retrieval mode: {mode}")
+    if mode == "hybrid" and lexical is None:
+        from lexical_index import get_lexical_index
+        lexical = get_lexical_index()
+
+    filter = {"product_id": product_id}
+    if mode == "vector" or lexical is None:
+        stats["vector"] += 1
+        store = store if store is not None else get_vector_store(embedding)
+        docs, query_vector = vector_search(store, question, k, filter, embedding)
+        return Retrieved(docs, "vector", query_vector)
+
+    lexical_results = lexical.search(question, product_id, k=k * CANDIDATE_FACTOR)
+    if lexical_confident(lexical_results):
+        stats["lexical_fast_path"] += 1
+        return Retrieved([hit for hit, _ in lexical_results[:k]], "lexical_fast_path")
+
+    stats["hybrid"] += 1
+    store = store if store is not None else get_vector_store(embedding)
+    vector_results, query_vector = vector_search(store, question, k * CANDIDATE_FACTOR, filter, embedding)
+    return Retrieved(rrf_fuse([vector_results, [hit for hit, _ in lexical_results]], k), "hybrid", query_vector)
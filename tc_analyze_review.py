@@ -8,6 +8,7 @@ from schemas.review_schema import review_schema
 # import completion and MODEL for direct LLM analysis
 from litellm import completion
 from config import MODEL 
+assert MODEL, "Set MODEL in .env (e.g., groq/openai/gpt-oss-120b)"
 
 # define prompt template for LLM to perform Aspect-Based Sentiment Analysis (ABSA)
 LLM_ANALYSIS_PROMPT_TEMPLATE = """
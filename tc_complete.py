@@ -2,6 +2,7 @@ import json
 from litellm import completion
 from typing import List, Dict, Any
 from config import MODEL
+assert MODEL, "Set MODEL in .env (e.g., groq/openai/gpt-oss-120b)"
 
 # import the tool classes
 from tc_analyze_review import ReviewTools
@@ -0,0 +1,89 @@
+"""จำนวนครั้งที่ embed คำถามตลอดขั้น answer cache -> retrieval -> answer cache ของหนึ่งคำถาม"""
+import pytest
+
+import retrieval
+import lexical_index
+import vector_store
+from answer_cache import AnswerCache
+from embeddings import HashingEmbeddings, QueryEmbeddingCache
+
+PID = "B001"
+VERSION = 1
+CHUNKS = [
+    "วิธีล้างแปรงแต่งหน้าให้สะอาดด้วยสบู่อ่อนแล้วผึ่งให้แห้ง",
+    "ราคาสินค้าสามร้อยเก้าสิบเก้าบาทรวมภาษีแล้ว",
+    "สีของบลัชมีทั้งหมดสิบเอ็ดสีเข้ากับทุกเฉดผิว",
+]
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.queries = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return super().embed_query(text)
+
+@pytest.fixture
+def runtime(tmp_path):
+    items = [{"text": t, "product_id": PID, "chunk_id": f"c{i}", "source_file": "test.json"}
+             for i, t in enumerate(CHUNKS)]
+    base = CountingEmbeddings()
+    embedder = QueryEmbeddingCache(base)
+    vector_store.build(items, embedder, path=str(tmp_path / "vector_index"))
+    store = vector_store.NumpyVectorStore(embedder, str(tmp_path / "vector_index"))
+    lexical = lexical_index.LexicalIndex(lexical_index.build_index(items))
+    cache = AnswerCache(threshold=0.8)
+    yield base, embedder, store, lexical, cache
+    store.close()
+
+def ask(runtime, question):
+    """ลำดับเดียวกับ query.stream_answer: exact -> retrieve -> semantic -> เก็บคำตอบ; คืนว่าตอบจากไหน"""
+    _, embedder, store, lexical, cache = runtime
+    if cache.get(PID, question, version=VERSION):
+        return "exact"
+    docs = retrieval.retrieve(question, PID, k=3, store=store, embedding=embedder, mode="hybrid", lexical=lexical)
+    if cache.get_similar(PID, docs.query_vector, version=VERSION):
+        return "semantic"
+    cache.put(PID, question, {"answer": question, "sources": []}, version=VERSION, vector=docs.query_vector)
+    return docs.mode
+
+def test_new_question_is_embedded_once_with_a_cold_cache(runtime):
+    assert ask(runtime, "ส่งของกี่วัน") == "hybrid"
+    assert runtime[0].queries == 1
+
+def test_new_question_is_embedded_once_with_a_warm_cache(runtime):
+    ask(runtime, "ส่งของกี่วัน")
+    before = runtime[0].queries
+    assert ask(runtime, "มีโปรโมชั่นไหม") == "hybrid"
+    assert runtime[0].queries - before == 1
+
+def test_semantic_hit_reuses_the_retrieval_vector(runtime):
+    ask(runtime, "ส่งของกี่วัน")
+    before = runtime[0].queries
+    assert ask(runtime, "ส่งของ กี่วัน") == "semantic"
+    assert runtime[0].queries - before == 1
+
+def test_exact_hit_does_not_embed(runtime):
+    ask(runtime, "ส่งของกี่วัน")
+    before = runtime[0].queries
+    assert ask(runtime, "ส่งของกี่วันคะ") == "exact"
+    assert runtime[0].queries == before
+
+def test_fast_path_question_is_not_embedded_with_a_cold_cache(runtime):
+    assert ask(runtime, "ล้างแปรง") == "lexical_fast_path"
+    assert runtime[0].queries == 0
+
+def test_fast_path_question_is_not_embedded_with_a_warm_cache(runtime):
+    ask(runtime, "ส่งของกี่วัน")
+    ask(runtime, "ล้างแปรง")
+    before = runtime[0].queries
+    assert ask(runtime, "ราคาสินค้า") == "lexical_fast_path"
+    assert ask(runtime, "ล้างแปรงครับ") == "exact"
+    assert runtime[0].queries == before
+
+def test_fast_path_answer_is_stored_exact_only(runtime):
+    cache = runtime[4]
+    ask(runtime, "ล้างแปรง")
+    [(created_at, result, vector)] = cache._entries.values()
+    assert vector is None
@@ -0,0 +1,31 @@
+"""context_packer.pack ต้องเหลือ chunk อย่างน้อยหนึ่งตัวเสมอ แม้ similarity กับคำถามติดลบทั้งหมด"""
+import numpy as np
+
+import context_packer
+from hits import Hit
+from retrieval import Retrieved
+
+class FixedEmbeddings:
+    def embed_query(self, text):
+        raise AssertionError("pack ต้องใช้ query_vector ของ retrieval")
+
+    def embed_documents(self, texts):
+        raise AssertionError("pack ต้องใช้ Hit.vector ของ store")
+
+def retrieved(vectors, query_vector):
+    hits = [Hit(f"ข้อมูลชิ้นที่ {i} ของสินค้า", {"source_file": f"faq_{i}.json"}, 0.0, np.asarray(v, dtype=np.float32))
+            for i, v in enumerate(vectors)]
+    return Retrieved(hits, "vector", np.asarray(query_vector, dtype=np.float32))
+
+def test_all_negative_relevance_keeps_the_top_chunk():
+    docs = retrieved([[-1.0, 0.2], [-1.0, -0.5], [-0.2, -1.0]], [1.0, 0.0])
+    packed, context, report = context_packer.pack("คำถาม", docs, FixedEmbeddings())
+    assert [h.metadata["source_file"] for h in packed] == ["faq_2.json"]
+    assert report["dropped_similarity"] == 2
+    assert "faq_2.json" in context
+
+def test_relative_cutoff_still_applies_when_the_top_is_positive():
+    docs = retrieved([[1.0, 0.0], [0.8, 0.6], [0.1, 1.0]], [1.0, 0.0])
+    packed, _, report = context_packer.pack("คำถาม", docs, FixedEmbeddings())
+    assert [h.metadata["source_file"] for h in packed] == ["faq_0.json", "faq_1.json"]
+    assert report["dropped_similarity"] == 1
@@ -0,0 +1,79 @@
+"""generation ใหม่ต้องพา component ของ backend อื่นมาด้วย reader ที่ยังใช้ backend นั้นจึงไม่เจอ index ว่าง"""
+import os
+
+import pytest
+
+import generations
+import live_index
+
+def write(path, text="x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+def test_build_keeps_the_other_backends_component(tmp_path):
+    root = str(tmp_path / "indexes")
+    with generations.stage(root=root) as gen:
+        write(gen.path("chroma_db/chroma.sqlite3"))
+        write(gen.path("lexical_index.json"), "{}")
+        gen.components["chroma"] = {"chunks": 1}
+        gen.components["lexical"] = {"chunks": 1}
+    with generations.stage(root=root) as gen:
+        write(gen.path("vector_index/manifest.json"), "{}")
+        gen.components["numpy"] = {"rows": 1}
+        gen.components["lexical"] = {"chunks": 1}
+
+    assert generations.current_generation(root) == 2
+    current = generations.gen_dir(2, root)
+    assert os.path.exists(os.path.join(current, "chroma_db", "chroma.sqlite3"))
+    assert os.path.exists(os.path.join(current, "vector_index", "manifest.json"))
+    components = generations.read_manifest(2, root)["components"]
+    assert components["chroma"] == {"chunks": 1, "carried_from": 1}
+    assert components["numpy"] == {"rows": 1}
+    assert components["lexical"] == {"chunks": 1}
+
+def test_missing_component_is_an_error_not_an_empty_index(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with generations.stage() as gen:
+        write(gen.path("vector_index/manifest.json"), "{}")
+    with pytest.raises(FileNotFoundError, match="--backend chroma"):
+        live_index.resolve(live_index.PERSIST_DIR)
+    assert not os.path.exists(os.path.join(generations.gen_dir(1), live_index.PERSIST_DIR))
+
+def fake_chroma(persist_dir):
+    """chroma_db ที่มี schema ส่วนที่ chroma_write_paths อ่าน: collection a/b และ HNSW segment ของแต่ละตัว"""
+    import sqlite3
+    os.makedirs(persist_dir)
+    conn = sqlite3.connect(os.path.join(persist_dir, "chroma.sqlite3"))
+    conn.execute("CREATE TABLE collections (id TEXT, name TEXT)")
+    conn.execute("CREATE TABLE segments (id TEXT, type TEXT, scope TEXT, collection TEXT)")
+    conn.executemany("INSERT INTO collections VALUES (?, ?)", [("ca", "a"), ("cb", "b")])
+    conn.executemany("INSERT INTO segments VALUES (?, 'hnsw', 'VECTOR', ?)", [("sa", "ca"), ("sb", "cb")])
+    conn.commit()
+    conn.close()
+    for segment in ("sa", "sb"):
+        write(os.path.join(persist_dir, segment, "data_level0.bin"), "v" * 1000)
+
+def test_chroma_sync_copies_only_what_it_writes(tmp_path):
+    root = str(tmp_path / "indexes")
+    with generations.stage(root=root) as gen:
+        fake_chroma(gen.path(live_index.PERSIST_DIR))
+        write(gen.path("lexical_index.json"), "{}")
+        gen.components["chroma"] = {"chunks": 1}
+
+    parent = os.path.join(generations.gen_dir(1, root), live_index.PERSIST_DIR)
+    copy = live_index.chroma_write_paths(parent, "a")
+    assert sorted(copy) == [os.path.join("chroma_db", "chroma.sqlite3"), os.path.join("chroma_db", "sa")]
+    with generations.stage(root=root, copy=copy) as gen:
+        gen.components["chroma"] = {"chunks": 2}
+
+    def same_file(rel):
+        return os.path.samefile(os.path.join(generations.gen_dir(1, root), rel),
+                                os.path.join(generations.gen_dir(2, root), rel))
+    assert not same_file("chroma_db/chroma.sqlite3")
+    assert not same_file("chroma_db/sa/data_level0.bin")
+    assert same_file("chroma_db/sb/data_level0.bin")
+    assert same_file("lexical_index.json")
+    carried = generations.read_manifest(2, root)["carried"]
+    assert carried["copied_bytes"] == os.path.getsize(os.path.join(parent, "chroma.sqlite3")) + 1000
+    assert carried["linked_bytes"] == 1000 + 2
@@ -0,0 +1,63 @@
+"""ingest ต้องได้ chunk เดียวกับ corpus.jsonl ที่ commit ไว้: ไม่ fallback ตัวแบ่งประโยคเงียบ ๆ และ manifest ต้องตรงกับ settings ปกติ"""
+from functools import partial
+
+import pytest
+
+import ingest
+import token_count
+
+def test_thai_chunker_refuses_to_fall_back_without_crfcut(monkeypatch):
+    import pythainlp.tokenize
+    def no_crfsuite(*args, **kwargs):
+        raise ModuleNotFoundError("No module named 'pycrfsuite'")
+    monkeypatch.setattr(pythainlp.tokenize, "sent_tokenize", no_crfsuite)
+    monkeypatch.setattr(ingest, "_crfcut_ok", None)
+    with pytest.raises(RuntimeError, match="python-crfsuite"):
+        ingest.ingest_settings("thai", "structured")
+    with pytest.raises(RuntimeError, match="--chunker words"):
+        ingest.split_sentences("ทดสอบ")
+    # chunker words ไม่ใช้ตัวแบ่งประโยค
+    assert ingest.ingest_settings("words", "structured")["chunker"] == "words"
+
+def test_committed_manifest_matches_default_settings():
+    """corpus.jsonl ที่ commit ไว้ต้องสร้างด้วย settings ปกติ ไม่อย่างนั้น ingest --incremental ครั้งแรกจะทำใหม่ทั้งหมด"""
+    if token_count.tokenizer_name() != token_count.ENCODING_NAME:
+        pytest.skip("โหลด tiktoken cl100k_base ไม่ได้บนเครื่องนี้")
+    ingest._crfcut_ok = None
+    manifest = ingest.load_manifest()
+    assert manifest["settings"] == ingest.ingest_settings(ingest.DEFAULT_CHUNKER, ingest.DEFAULT_PRODUCT_MODE)
+    assert len(manifest["files"]) == len(ingest.list_data_files(ingest.DATA_DIR))
+
+def write_faqs(data_dir, solutions):
+    import json
+    data_dir.mkdir(exist_ok=True)
+    faqs = [{"product_id": "B001", "question": f"คำถามข้อ {i}", "solution": s} for i, s in enumerate(solutions)]
+    (data_dir / "faq_B001.json").write_text(json.dumps(faqs, ensure_ascii=False), encoding="utf-8")
+
+def run(tmp_path, **kwargs):
+    return ingest.main(chunker="words", data_dir=str(tmp_path / "data"), corpus_file=str(tmp_path / "corpus.jsonl"),
+                       manifest_file=str(tmp_path / "manifest.json"), **kwargs)
+
+def test_dedup_runs_before_the_corpus_is_replaced(tmp_path, monkeypatch):
+    import dedup
+    answer = "ล้างแปรงด้วยสบู่อ่อนแล้วล้างน้ำสะอาดจนฟองหมด จากนั้นบีบน้ำออกและผึ่งลมให้แห้งสนิทก่อนเก็บ"
+    write_faqs(tmp_path / "data", [answer, answer, "สีจางให้ทาซ้ำเบา ๆ หลายชั้น"])
+    run(tmp_path)
+    before = (tmp_path / "corpus.jsonl").read_text(encoding="utf-8")
+
+    original = dedup.dedup_corpus
+    def broken(corpus_file, **kwargs):
+        raise RuntimeError("dedup failed")
+    monkeypatch.setattr(dedup, "dedup_corpus", broken)
+    write_faqs(tmp_path / "data", [answer, answer, "สีจางให้ทาซ้ำเบา ๆ หลายชั้นแล้วเซ็ตด้วยแป้ง"])
+    with pytest.raises(RuntimeError):
+        run(tmp_path, dedup_chunks=True)
+    assert (tmp_path / "corpus.jsonl").read_text(encoding="utf-8") == before
+    assert not ingest.load_manifest(str(tmp_path / "manifest.json"))["settings"]["dedup"]
+    assert not (tmp_path / "corpus.jsonl.tmp").exists()
+
+    # embedding_dim ใช้แค่คำนวณ index_bytes_saved (ไม่ต้องอ่าน config.py)
+    monkeypatch.setattr(dedup, "dedup_corpus", partial(original, embedding_dim=8))
+    report = run(tmp_path, dedup_chunks=True)["dedup"]
+    assert report["duplicates"] == 1
+    assert "duplicate_of" in (tmp_path / "corpus.jsonl").read_text(encoding="utf-8")
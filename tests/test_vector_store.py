@@ -0,0 +1,55 @@
+"""build(reuse=True) สร้างใหม่เฉพาะ shard ของสินค้าที่ chunk เปลี่ยน shard อื่นเป็น hard link ไม่ embed ซ้ำ"""
+import os, shutil
+
+import vector_store
+from embeddings import HashingEmbeddings
+
+INFO = {"provider": "hashing", "model": "test", "dimensions": 0}
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.documents = 0
+
+    def embed_documents(self, texts):
+        self.documents += len(texts)
+        return super().embed_documents(texts)
+
+def items(lip_price="ราคา 390 บาท"):
+    return [{"chunk_id": "b1", "product_id": "B001", "source_file": "faq_B001.json", "text": "ล้างแปรงด้วยสบู่อ่อน"},
+            {"chunk_id": "b2", "product_id": "B001", "source_file": "faq_B001.json", "text": "ผึ่งแปรงให้แห้ง"},
+            {"chunk_id": "l1", "product_id": "L001", "source_file": "product_L001.json", "text": lip_price}]
+
+def shard_file(path, name):
+    return os.path.join(path, "shards", name, "vectors.npy")
+
+def test_reuse_rebuilds_only_changed_shards(tmp_path):
+    old, new = str(tmp_path / "old"), str(tmp_path / "new")
+    emb = CountingEmbeddings()
+    vector_store.build(items(), emb, path=old, embedding_info=INFO)
+    os.link(shard_file(old, "B001"), str(tmp_path / "keep.npy"))  # inode ของ shard B001 เดิม
+
+    # แบบเดียวกับ generation ใหม่: เริ่มจากสำเนาของ vector_index เดิมแล้ว build ทับ
+    shutil.copytree(old, new, dirs_exist_ok=True, copy_function=os.link)
+    emb.documents = 0
+    assert vector_store.build(items("ราคา 450 บาท"), emb, path=new, embedding_info=INFO, reuse=True) == 3
+    assert emb.documents == 1
+    assert os.path.samefile(shard_file(new, "B001"), str(tmp_path / "keep.npy"))
+    assert not os.path.samefile(shard_file(new, "L001"), shard_file(old, "L001"))
+
+    store = vector_store.NumpyVectorStore(emb, new)
+    assert store.similarity_search("ราคา 450 บาท", k=1, filter={"product_id": "L001"})[0].page_content == "ราคา 450 บาท"
+    store.close()
+
+def test_reuse_needs_the_same_embedding_and_quantization(tmp_path):
+    path = str(tmp_path / "vector_index")
+    emb = CountingEmbeddings()
+    vector_store.build(items(), emb, path=path, embedding_info=INFO)
+    emb.documents = 0
+    vector_store.build(items(), emb, path=path, embedding_info=INFO, reuse=True)
+    assert emb.documents == 0
+    vector_store.build(items(), emb, path=path, embedding_info=dict(INFO, model="other"), reuse=True)
+    assert emb.documents == 3
+    emb.documents = 0
+    vector_store.build(items(), emb, path=path, embedding_info=dict(INFO, model="other"), quantization="int8", reuse=True)
+    assert emb.documents == 3
@@ -0,0 +1,37 @@
+"""
+นับจำนวน token ของข้อความด้วย encoding เดียวกับ OpenAI embeddings/chat (cl100k_base)
+
+ถ้าไม่มี tiktoken หรือโหลดไฟล์ encoding ไม่ได้ (เช่นเครื่องที่ไม่มี network)
+จะประมาณจากจำนวน byte ของ UTF-8 แทน (~4 byte ต่อ token) พร้อม [WARN] เพราะ chunk ที่ ingest ได้
+จะไม่ตรงกับ corpus/ingest_manifest.json ที่สร้างด้วย cl100k_base (ingest --incremental จะทำใหม่ทั้งหมด)
+"""
+import math
+
+ENCODING_NAME = "cl100k_base"
+
+_encoding = None
+_encoding_loaded = False
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(ENCODING_NAME)
+        except Exception as e:
+            _encoding = None
+            print(f"[WARN] โหลด tiktoken {ENCODING_NAME} ไม่ได้ ({type(e).__name__}) นับ token จาก byte ของ UTF-8 แทน "
+                  "(ตั้ง TIKTOKEN_CACHE_DIR ให้ชี้ไฟล์ encoding บนเครื่องที่ไม่มี network)")
+    return _encoding
+
+def tokenizer_name():
+    return ENCODING_NAME if _get_encoding() is not None else "utf8-bytes/4"
+
+def count_tokens(text):
+    if not text:
+        return 0
+    enc = _get_encoding()
+    if enc is not None:
+        return len(enc.encode(text))
+    return math.ceil(len(text.encode("utf-8")) / 4)
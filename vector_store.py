@@ -0,0 +1,302 @@
+"""
+Vector store ใน process: เมทริกซ์ float32 แบบ memory-mapped (NumPy) หรือ index ของ FAISS
+
+ทั้ง corpus ตอนนี้ (ไม่กี่ร้อย chunk) อยู่ใน RAM ได้สบาย การค้นผ่าน Chroma (persistence + filter)
+จึงเป็น overhead ล้วน ๆ index แบ่งเป็น shard ละ product_id (หน้าสินค้าแต่ละหน้าค้นแค่ shard ของตัวเอง
+เวลาค้นจึงไม่โตตามจำนวนสินค้าใน catalog) และ shard "_global" สำหรับ chunk ที่ไม่มี product_id:
+
+    vector_index/
+        manifest.json              จำนวนแถว, มิติ, embedding ที่ใช้ และรายการ shard
+        shards/<product_id>/
+            vectors.npy            เวกเตอร์ float32 ที่ normalize แล้ว (เปิดแบบ mmap)
+            rows.bin               chunk ของแต่ละแถว (corpus_store) อ่านเฉพาะแถวที่ถูกค้นเจอ
+            faiss.index            มีเมื่อ shard ใหญ่พอและติดตั้ง faiss-cpu ไว้
+
+ชนิด index เลือกตามขนาดของแต่ละ shard: ต่ำกว่า 20k แถวค้นตรง ๆ ด้วย NumPy (exact และเร็วสุดที่ขนาดนี้),
+ถึง 500k ใช้ FAISS HNSW, ใหญ่กว่านั้นใช้ FAISS IVF
+
+build(reuse=True) ใช้ shard เดิมใน path ซ้ำถ้า chunk ของ shard นั้นไม่เปลี่ยน (เทียบ "hash" ใน manifest)
+และ embedding/quantization เหมือนเดิม: ไฟล์ของ shard เป็น hard link ไม่ต้อง embed หรือเขียนใหม่
+งาน sync จึงเป็นสัดส่วนกับจำนวนสินค้าที่ข้อมูลเปลี่ยน (หน่วยที่เล็กที่สุดคือทั้ง shard ของสินค้านั้น)
+
+quantization (ดู quantization.py) เก็บเวกเตอร์ที่ใช้ค้นเป็น int8 หรือ PQ แทน float32 แล้ว rescore
+ผู้สมัคร k * RESCORE_FACTOR อันดับแรกด้วยเวกเตอร์ float32 จริงจาก vectors.npy
+"""
+import os, re, json, shutil, hashlib, tempfile
+from collections import defaultdict
+
+import numpy as np
+
+import corpus_store
+from hits import Hit
+from quantization import QUANTIZATIONS, PQ_SUBVECTOR_DIM, train_codec, load_codec
+
+VECTOR_DIR = "vector_index"
+HNSW_MIN_ROWS = 20_000
+IVF_MIN_ROWS = 500_000
+EMBED_BATCH = 256
+GLOBAL_SHARD = "_global"
+RESCORE_FACTOR = 4
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+def choose_index_type(n_rows):
+    if faiss is None or n_rows < HNSW_MIN_ROWS:
+        return "numpy"
+    return "hnsw" if n_rows < IVF_MIN_ROWS else "ivf"
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def faiss_descriptor(index_type, quantization, n_rows, dim):
+    if index_type == "hnsw":
+        return "HNSW32" + ("_SQ8" if quantization == "int8" else "")
+    codes = {"none": "Flat", "int8": "SQ8"}.get(quantization) or f"PQ{dim // PQ_SUBVECTOR_DIM}"
+    return f"IVF{int(4 * np.sqrt(n_rows))},{codes}"
+
+def build_faiss_index(vectors, index_type, quantization="none"):
+    index = faiss.index_factory(vectors.shape[1], faiss_descriptor(index_type, quantization, *vectors.shape),
+                                faiss.METRIC_INNER_PRODUCT)
+    if index_type == "hnsw":
+        index.hnsw.efConstruction = 80
+    index.train(vectors)
+    index.add(vectors)
+    return index
+
+def shard_name(product_id):
+    """ชื่อโฟลเดอร์ของ shard; product_id ว่างไปอยู่ใน shard _global"""
+    if not product_id:
+        return GLOBAL_SHARD
+    if re.fullmatch(r"[A-Za-z0-9][\w.-]*", product_id):
+        return product_id
+    return "p-" + hashlib.sha1(product_id.encode("utf-8")).hexdigest()[:16]
+
+def embed_items(items, embedding):
+    vectors = []
+    for i in range(0, len(items), EMBED_BATCH):
+        vectors.extend(embedding.embed_documents([it["text"] for it in items[i:i + EMBED_BATCH]]))
+    return normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(items), -1))
+
+def write_shard(shard_dir, items, matrix, quantization="none"):
+    """เขียน shard หนึ่งอัน คืน (ชนิด index, จำนวน byte ที่ต้องโหลดไว้ตอนค้น)"""
+    os.makedirs(shard_dir)
+    np.save(os.path.join(shard_dir, "vectors.npy"), matrix)
+    rows_jsonl = os.path.join(shard_dir, "rows.jsonl")
+    with open(rows_jsonl, "w", encoding="utf-8") as f:
+        for it in items:
+            f.write(json.dumps(it, ensure_ascii=False) + "\n")
+    corpus_store.build_store(rows_jsonl, os.path.join(shard_dir, "rows.bin"), quiet=True)
+    os.remove(rows_jsonl)
+
+    index_type = choose_index_type(len(items))
+    if index_type == "hnsw" and quantization == "pq":
+        index_type = "ivf"  # HNSW+PQ ของ FAISS ให้ผลไม่ถูกกับ inner product
+    if index_type != "numpy":
+        index_file = os.path.join(shard_dir, "faiss.index")
+        faiss.write_index(build_faiss_index(matrix, index_type, quantization), index_file)
+        return index_type, os.path.getsize(index_file)
+    if quantization != "none":
+        codec = train_codec(quantization, matrix)
+        codec.save(shard_dir)
+        return index_type, codec.nbytes
+    return index_type, matrix.nbytes
+
+def shard_hash(items):
+    h = hashlib.sha256()
+    for it in items:
+        h.update(json.dumps(it, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+def reusable_shards(path, embedding_info, quantization):
+    """shard ของ vector_index เดิมใน path ที่ใช้ซ้ำได้ ({} ถ้า embedding/quantization ต่างกันหรือไม่มีข้อมูลพอเทียบ)"""
+    manifest_file = os.path.join(path, "manifest.json")
+    if not embedding_info or not os.path.exists(manifest_file):
+        return {}
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    if old.get("embedding") != embedding_info or old.get("quantization", "none") != quantization:
+        return {}
+    return {name: dict(info, dim=old["dim"]) for name, info in old["shards"].items() if info.get("hash")}
+
+def link_shard(src, dst):
+    os.makedirs(dst)
+    for name in os.listdir(src):
+        try:
+            os.link(os.path.join(src, name), os.path.join(dst, name))
+        except OSError:
+            shutil.copy2(os.path.join(src, name), os.path.join(dst, name))
+
+def build(items, embedding, path=VECTOR_DIR, embedding_info=None, quantization="none", reuse=False):
+    """
+    สร้าง vector_index/ จาก chunk (dict แบบใน corpus.jsonl) แล้วสลับเข้าแทนของเดิม
+    reuse: ใช้ shard เดิมใน path ที่ chunk ไม่เปลี่ยนซ้ำ (ต้องส่ง embedding_info มาด้วย)
+    คืนจำนวนแถวที่ index
+    """
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"unknown quantization: {quantization}")
+    by_shard = defaultdict(list)
+    for it in items:
+        if not it.get("duplicate_of"):
+            by_shard[shard_name(it.get("product_id"))].append(it)
+    previous = reusable_shards(path, embedding_info, quantization) if reuse else {}
+
+    parent = os.path.dirname(os.path.abspath(path))
+    tmp = tempfile.mkdtemp(prefix=".vector_index-", dir=parent)
+    try:
+        shards, dim, reused = {}, 0, 0
+        for name in sorted(by_shard):
+            shard_items = by_shard[name]
+            digest = shard_hash(shard_items)
+            old = previous.get(name)
+            if old and old["hash"] == digest:
+                link_shard(os.path.join(path, "shards", name), os.path.join(tmp, "shards", name))
+                dim = old.pop("dim")
+                shards[name] = old
+                reused += 1
+                continue
+            matrix = embed_items(shard_items, embedding)
+            dim = int(matrix.shape[1])
+            index_type, nbytes = write_shard(os.path.join(tmp, "shards", name), shard_items, matrix, quantization)
+            shards[name] = {"product_id": shard_items[0].get("product_id") or "",
+                            "rows": len(shard_items), "index": index_type, "bytes": nbytes, "hash": digest}
+
+        rows = sum(sh["rows"] for sh in shards.values())
+        manifest = {"rows": rows, "dim": dim, "embedding": embedding_info or {}, "quantization": quantization,
+                    "bytes_per_chunk": sum(sh["bytes"] for sh in shards.values()) / max(rows, 1),
+                    "shards": shards}
+        with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        # สลับโฟลเดอร์ใหม่เข้าแทน (reader ที่เปิด mmap ของเดิมไว้ยังอ่านต่อได้)
+        old = None
+        if os.path.exists(path):
+            old = tmp + ".old"
+            os.replace(path, old)
+        os.replace(tmp, path)
+        if old:
+            shutil.rmtree(old, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    print(f"[INFO] Built vector index with {manifest['rows']} rows in {len(shards)} shards in {path}"
+          f" ({quantization}, {manifest['bytes_per_chunk']:.0f} bytes/chunk, {reused} shards unchanged)")
+    return manifest["rows"]
+
+class Shard:
+    """index ของ product_id เดียว"""
+
+    def __init__(self, path, index_type, quantization="none", hnsw_ef=64, ivf_nprobe=16, rescore=RESCORE_FACTOR):
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.rows = corpus_store.CorpusStore(os.path.join(path, "rows.bin"))
+        self.rescore = rescore if quantization != "none" else 0
+        self.index = self.codec = None
+        if index_type == "numpy" and quantization != "none":
+            self.codec = load_codec(quantization, path)
+        if index_type != "numpy" and faiss is not None:
+            self.index = faiss.read_index(os.path.join(path, "faiss.index"))
+            if index_type == "hnsw":
+                self.index.hnsw.efSearch = hnsw_ef
+            else:
+                self.index.nprobe = ivf_nprobe
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def search(self, q, k):
+        """คืน [(row, score)] เรียงจากคล้ายที่สุด"""
+        n = k * self.rescore if self.rescore else k
+        if self.index is not None:
+            scores, ids = self.index.search(q[None, :], n)
+            found = [(int(i), float(s)) for i, s in zip(ids[0], scores[0]) if i >= 0]
+        else:
+            scores = self.codec.scores(q) if self.codec is not None else self.vectors @ q
+            n = min(n, len(scores))
+            top = np.argpartition(-scores, n - 1)[:n]
+            top = top[np.argsort(-scores[top])]
+            found = [(int(r), float(scores[r])) for r in top]
+        if not self.rescore or not found:
+            return found[:k]
+
+        rows = np.array(sorted(r for r, _ in found))
+        exact = self.vectors[rows] @ q
+        order = np.argsort(-exact)[:k]
+        return [(int(rows[i]), float(exact[i])) for i in order]
+
+    def close(self):
+        self.rows.close()
+
+class NumpyVectorStore:
+    """ค้นเวกเตอร์ใน process; มี similarity_search แบบเดียวกับ Chroma ของ LangChain"""
+
+    def __init__(self, embedding, path=VECTOR_DIR, hnsw_ef=64, ivf_nprobe=16, rescore=RESCORE_FACTOR):
+        self.embedding = embedding
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self._hnsw_ef, self._ivf_nprobe, self._rescore = hnsw_ef, ivf_nprobe, rescore
+        # เปิด shard เมื่อถูกค้นครั้งแรก process ของหน้าสินค้าจึง map แค่ shard ของตัวเอง
+        self._shards = {}
+
+    def __len__(self):
+        return self.manifest["rows"]
+
+    def shard(self, name):
+        shard = self._shards.get(name)
+        if shard is None:
+            info = self.manifest["shards"][name]
+            shard = Shard(os.path.join(self.path, "shards", name), info["index"],
+                          self.manifest.get("quantization", "none"), self._hnsw_ef, self._ivf_nprobe, self._rescore)
+            self._shards[name] = shard
+        return shard
+
+    def _shard_names(self, filter):
+        if not filter:
+            return list(self.manifest["shards"])
+        unsupported = set(filter) - {"product_id"}
+        if unsupported:
+            raise ValueError(f"NumpyVectorStore only filters on product_id, got {sorted(unsupported)}")
+        name = shard_name(filter["product_id"])
+        return [name] if name in self.manifest["shards"] else []
+
+    def search_by_vector(self, vector, k=4, filter=None):
+        """คืน [(shard, row, score)] เรียงจากคล้ายที่สุด"""
+        q = np.asarray(vector, dtype=np.float32)
+        if len(q) != self.manifest["dim"]:
+            raise ValueError(f"query vector has {len(q)} dimensions but {self.path} was built with "
+                             f"{self.manifest['dim']}; reindex with python index.py --backend numpy")
+        q = q / (np.linalg.norm(q) or 1.0)  # ไม่แก้เวกเตอร์ของผู้เรียก
+        hits = []
+        for name in self._shard_names(filter):
+            hits.extend((name, row, score) for row, score in self.shard(name).search(q, k))
+        hits.sort(key=lambda h: -h[2])
+        return hits[:k]
+
+    def _hits(self, found):
+        hits = []
+        for name, row, score in found:
+            shard = self.shard(name)
+            item = shard.rows.record(row)
+            metadata = {key: value for key, value in item.items() if key != "text"}
+            hits.append(Hit(item["text"], metadata, score, shard.vectors[row]))
+        return hits
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None):
+        """เหมือน similarity_search แต่รับเวกเตอร์คำถามที่ embed ไว้แล้ว (ชื่อ/argument เดียวกับ Chroma)"""
+        return self._hits(self.search_by_vector(embedding, k, filter))
+
+    def similarity_search_with_score(self, query, k=4, filter=None):
+        hits = self.similarity_search(query, k, filter)
+        return [(h, h.score) for h in hits]
+
+    def similarity_search(self, query, k=4, filter=None):
+        return self.similarity_search_by_vector(self.embedding.embed_query(query), k, filter)
+
+    def close(self):
+        for shard in self._shards.values():
+            shard.close()
+        self._shards.clear()
@@ -0,0 +1,96 @@
+"""
+Watch mode: คอยดู data/ และ reviews/ แล้วอัปเดต index ที่ใช้งานอยู่ทันที
+
+เมื่อไฟล์ใน data/ เปลี่ยน จะรัน ingest แบบ incremental ด้วย settings เดียวกับ ingest_manifest.json
+(chunker, product mode, dedup; ถ้า settings ไม่ตรง ingest จะทำใหม่ทั้งหมด) แล้วอัปเดต index ตาม VECTOR_BACKEND
+(chroma: add/update/delete ตาม chunk_id, numpy: สร้างใหม่เฉพาะ shard ของสินค้าที่ chunk เปลี่ยน)
+เป็น generation ใหม่ใน indexes/
+หน้า Streamlit ที่เปิดอยู่จะสลับไปใช้ index ใหม่เอง
+ไฟล์ใน reviews/ ถูกอ่านสด ๆ ทุกครั้งที่วิเคราะห์รีวิว (tc_analyze_review.py) จึงแค่แจ้งว่ามีการเปลี่ยน
+
+ใช้การ poll (stdlib ล้วน) จึงทำงานได้ทุก OS
+
+    python watch.py [--interval 2]
+"""
+import os, time, argparse
+
+import ingest
+import index
+
+REVIEWS_DIR = os.path.join(ingest.BASE_DIR, "reviews")
+
+def snapshot(directory):
+    state = {}
+    if not os.path.isdir(directory):
+        return state
+    for entry in os.scandir(directory):
+        if entry.is_file() and not entry.name.startswith("."):
+            st = entry.stat()
+            state[entry.name] = (st.st_mtime_ns, st.st_size)
+    return state
+
+def diff_names(old, new):
+    return sorted(n for n in set(old) | set(new) if old.get(n) != new.get(n))
+
+def ingest_options(chunker=None, product_mode=None, dedup_chunks=None, manifest_file=ingest.MANIFEST_FILE):
+    """argument ของ ingest.main: ค่าที่ส่งมา หรือ settings ของ ingest ครั้งล่าสุดใน manifest หรือค่า default"""
+    settings = ingest.load_manifest(manifest_file).get("settings", {})
+    return {"chunker": chunker or settings.get("chunker", ingest.DEFAULT_CHUNKER),
+            "product_mode": product_mode or settings.get("product_mode", ingest.DEFAULT_PRODUCT_MODE),
+            "dedup_chunks": settings.get("dedup", False) if dedup_chunks is None else dedup_chunks}
+
+def sync_data(options):
+    ingest.main(incremental=True, **options)
+    # index.main() เลือกตาม VECTOR_BACKEND: chroma sync ด้วย chunk_id (embed เฉพาะ chunk ที่เปลี่ยน)
+    # numpy ใช้ shard ของสินค้าที่ไม่เปลี่ยนซ้ำจาก generation เดิม ไม่มีอะไรเปลี่ยนทั้งคู่ก็ไม่ publish
+    index.main()
+
+def main(interval=2.0, chunker=None, product_mode=None, dedup_chunks=None):
+    options = ingest_options(chunker, product_mode, dedup_chunks)
+    print(f"[INFO] Ingest settings: chunker={options['chunker']}, product mode={options['product_mode']}, "
+          f"dedup={options['dedup_chunks']}")
+    dirs = {"data": ingest.DATA_DIR, "reviews": REVIEWS_DIR}
+    last = {name: snapshot(d) for name, d in dirs.items()}
+    # ตอนเริ่มให้ index ตามทันข้อมูลปัจจุบันก่อน
+    sync_data(options)
+    print(f"[INFO] Watching {', '.join(dirs.values())} every {interval}s (Ctrl+C to stop)")
+
+    while True:
+        time.sleep(interval)
+        current = {name: snapshot(d) for name, d in dirs.items()}
+        if current == last:
+            continue
+        # รอให้ไฟล์เขียนเสร็จ (snapshot ไม่เปลี่ยนอีก 1 รอบ) ก่อนค่อย ingest
+        time.sleep(interval)
+        settled = {name: snapshot(d) for name, d in dirs.items()}
+        if settled != current:
+            continue
+
+        changed_data = diff_names(last["data"], settled["data"])
+        changed_reviews = diff_names(last["reviews"], settled["reviews"])
+        last = settled
+        if changed_data:
+            print(f"[INFO] data/ changed: {', '.join(changed_data)}")
+            try:
+                sync_data(options)
+            except Exception as e:
+                # ไฟล์ JSON ที่ยังแก้ไม่เสร็จอาจ parse ไม่ได้ รอบถัดไปค่อยลองใหม่
+                print(f"[ERROR] Sync failed: {e}")
+                last["data"] = {}
+        if changed_reviews:
+            print(f"[INFO] reviews/ changed: {', '.join(changed_reviews)} (read on demand, nothing to index)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-ingest and upsert changed data files into the live index")
+    parser.add_argument("--interval", type=float, default=2.0, help="polling interval in seconds")
+    parser.add_argument("--chunker", choices=ingest.CHUNKERS,
+                        help="chunking strategy (default: the one recorded in ingest_manifest.json)")
+    parser.add_argument("--product-mode", choices=ingest.PRODUCT_MODES,
+                        help="product record chunking (default: the one recorded in ingest_manifest.json)")
+    parser.add_argument("--dedup", action=argparse.BooleanOptionalAction,
+                        help="run the near-duplicate stage on each ingest (default: as recorded in ingest_manifest.json)")
+    args = parser.parse_args()
+    try:
+        main(interval=args.interval, chunker=args.chunker, product_mode=args.product_mode, dedup_chunks=args.dedup)
+    except KeyboardInterrupt:
+        pass